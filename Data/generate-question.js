@@ -28,7 +28,9 @@ function generateQuestions(data, seed) {
     const template = templates[Math.floor(rng() * templates.length)];
     const question = template.replace("{name}", entry.name);
     return {
-      question
+      question,
+      name: entry.name,
+      href: entry.href
     };
   });
 }
@@ -1,106 +1,126 @@
 const { chromium } = require("playwright");
 const fs = require("fs");
+const crypto = require("crypto");
 
-const links = JSON.parse(fs.readFileSync("Data/penyakit-links.json"));
-const checkpointFile = "Data/checkpoint.json";
-let checkpoint = { lastIndex: 0, penyakitData: [] };
-if (fs.existsSync(checkpointFile)) {
-  checkpoint = JSON.parse(fs.readFileSync(checkpointFile));
-  console.log(`Melanjutkan dari indeks: ${checkpoint.lastIndex}`);
+// Konfigurasi
+const linksFile = process.env.SCRAPE_LINKS || "Data/penyakit-links.json";
+const logFile = process.env.SCRAPE_LOG || "Data/scrape-log.jsonl"; // Append-only: satu baris per halaman yang dicek
+const outputFile = process.env.SCRAPE_OUTPUT || "Data/penyakit-data-raw.jsonl"; // Versi terbaru per href, input preprocess.py
+const checkpointFile = "Data/checkpoint.json"; // Format lama, hanya dibaca untuk migrasi
+const baseUrl = process.env.SCRAPE_BASE_URL || ""; // Mis. http://localhost:8081 untuk situs tiruan lokal
+const concurrency = parseInt(process.env.SCRAPE_CONCURRENCY || "4", 10); // Jumlah page paralel
+const ratePerSec = parseFloat(process.env.SCRAPE_RATE || "1"); // Maksimal request per detik (semua page)
+const refreshHours = parseFloat(process.env.SCRAPE_REFRESH_HOURS || "24"); // Halaman yang dicek < ini dilewati (resume)
+const maxRetries = 2;
+
+const links = JSON.parse(fs.readFileSync(linksFile));
+
+const blacklistKeywords = [
+  "Beranda",
+  "Chat Bersama Dokter",
+  "Penyakit A-Z",
+  "Obat A-Z",
+  "Tentang Kami",
+  "Karier",
+  "Hubungi Kami",
+  "Tim Editorial",
+  "Langganan",
+  "Syarat & Ketentuan",
+  "Privasi",
+  "Iklan",
+  "Gabung di Tim Dokter",
+  "Daftarkan Rumah Sakit Anda",
+  "alomedika.com",
+  "Tanya Dokter",
+  "Pilih",
+  "Mohon tunggu",
+  "Pengiriman SMS",
+  "Hindari menggunakan kombinasi",
+  "Info Kesehatan",
+  "Cari Dokter",
+  "Alodokter Shop",
+  "Virus",
+  "Kanker",
+  "Jantung",
+  "Otak",
+  "Psikologi",
+  "Defisiensi",
+  "Infeksi",
+  "Mata",
+  "Pencernaan",
+  "Semua Penyakit",
+];
+
+function isBlacklisted(text) {
+  return blacklistKeywords.some((b) => text.includes(b));
 }
 
-(async () => {
-  const browser = await chromium.launch();
-  const page = await browser.newPage();
-
-  const delay = (ms) => new Promise((res) => setTimeout(res, ms));
-  const penyakitData = checkpoint.penyakitData;
-
-  const blacklistKeywords = [
-    "Beranda",
-    "Chat Bersama Dokter",
-    "Penyakit A-Z",
-    "Obat A-Z",
-    "Tentang Kami",
-    "Karier",
-    "Hubungi Kami",
-    "Tim Editorial",
-    "Langganan",
-    "Syarat & Ketentuan",
-    "Privasi",
-    "Iklan",
-    "Gabung di Tim Dokter",
-    "Daftarkan Rumah Sakit Anda",
-    "alomedika.com",
-    "Tanya Dokter",
-    "Pilih",
-    "Mohon tunggu",
-    "Pengiriman SMS",
-    "Hindari menggunakan kombinasi",
-    "Info Kesehatan",
-    "Cari Dokter",
-    "Alodokter Shop",
-    "Virus",
-    "Kanker",
-    "Jantung",
-    "Otak",
-    "Psikologi",
-    "Defisiensi",
-    "Infeksi",
-    "Mata",
-    "Pencernaan",
-    "Semua Penyakit",
-  ];
-
-  function isBlacklisted(text) {
-    return blacklistKeywords.some((b) => text.includes(b));
-  }
+const delay = (ms) => new Promise((res) => setTimeout(res, ms));
 
-  for (let i = checkpoint.lastIndex; i < links.length; i++) {
-    const link = links[i];
-    console.log(`Scraping ${link.name}: ${link.href}`);
+// Rate limit bersama: setiap request mendapat slot waktu berikutnya
+let nextSlot = 0;
+async function rateLimit() {
+  const now = Date.now();
+  const slot = Math.max(now, nextSlot);
+  nextSlot = slot + 1000 / ratePerSec;
+  if (slot > now) await delay(slot - now);
+}
 
-    try {
-      await page.goto(link.href, { waitUntil: "networkidle" });
-
-      // Ambil semua <p> dan <li> sebagai objek {tag, text}
-      const elements = await page.$$eval("p, li", (els) =>
-        els
-          .map((el) => ({
-            tag: el.tagName.toLowerCase(),
-            text: el.innerText.trim(),
-          }))
-          .filter((el) => el.text.length > 0)
-      );
-
-      // Filter blacklist
-      const filtered = elements.filter((el) => !isBlacklisted(el.text));
-
-      const paragraphs = [];
-      let lastParagraph = "";
-      let listBuffer = [];
-
-      for (const el of filtered) {
-        if (el.tag === "p") {
-          // Jika sebelumnya ada <li>, gabungkan ke lastParagraph
-          if (listBuffer.length > 0) {
-            if (lastParagraph.endsWith(":")) {
-              paragraphs[
-                paragraphs.length - 1
-              ] = `${lastParagraph} ${listBuffer.join("; ")}`;
-            } else {
-              paragraphs.push(listBuffer.join("; "));
-            }
-            listBuffer = [];
-          }
-          lastParagraph = el.text;
-          paragraphs.push(lastParagraph);
-        } else if (el.tag === "li") {
-          listBuffer.push(el.text);
-        }
+function fetchUrl(href) {
+  if (!baseUrl) return href;
+  const url = new URL(href);
+  return new URL(url.pathname + url.search, baseUrl).toString();
+}
+
+function contentHash(paragraphs) {
+  return crypto.createHash("sha1").update(JSON.stringify(paragraphs)).digest("hex");
+}
+
+// Baca log: status terakhir per href (etag, hash, waktu cek) dan versi konten terbaru
+function loadLog() {
+  const state = new Map();
+  const latest = new Map();
+  if (!fs.existsSync(logFile)) {
+    // Migrasi sekali dari checkpoint.json versi lama: dianggap sudah dicek saat file itu terakhir ditulis
+    if (fs.existsSync(checkpointFile)) {
+      const checkedAt = fs.statSync(checkpointFile).mtime.toISOString();
+      const lines = [];
+      for (const item of JSON.parse(fs.readFileSync(checkpointFile)).penyakitData) {
+        const record = { ...item, status: "changed", hash: contentHash(item.paragraphs), checkedAt };
+        state.set(item.href, { href: item.href, hash: record.hash, checkedAt });
+        latest.set(item.href, record);
+        lines.push(JSON.stringify(record) + "\n");
       }
+      fs.writeFileSync(logFile, lines.join(""));
+      console.log(`${latest.size} artikel diambil dari ${checkpointFile}`);
+    }
+    return { state, latest };
+  }
+  for (const line of fs.readFileSync(logFile, "utf-8").split("\n")) {
+    if (!line.trim()) continue;
+    let record;
+    try {
+      record = JSON.parse(line);
+    } catch {
+      continue; // Baris terakhir bisa terpotong jika proses sebelumnya mati
+    }
+    state.set(record.href, { ...state.get(record.href), ...record, paragraphs: undefined });
+    if (record.paragraphs) latest.set(record.href, record);
+  }
+  return { state, latest };
+}
+
+function extractParagraphs(elements) {
+  // Filter blacklist
+  const filtered = elements.filter((el) => !isBlacklisted(el.text));
+
+  const paragraphs = [];
+  let lastParagraph = "";
+  let listBuffer = [];
 
-      // Tangani sisa <li> di akhir
+  for (const el of filtered) {
+    if (el.tag === "p") {
+      // Jika sebelumnya ada <li>, gabungkan ke lastParagraph
       if (listBuffer.length > 0) {
         if (lastParagraph.endsWith(":")) {
           paragraphs[
@@ -109,29 +129,148 @@ if (fs.existsSync(checkpointFile)) {
         } else {
           paragraphs.push(listBuffer.join("; "));
         }
+        listBuffer = [];
       }
+      lastParagraph = el.text;
+      paragraphs.push(lastParagraph);
+    } else if (el.tag === "li") {
+      listBuffer.push(el.text);
+    }
+  }
 
-      penyakitData.push({
-        name: link.name,
-        href: link.href,
-        paragraphs,
-      });
-
-      checkpoint = {
-        lastIndex: i + 1,
-        penyakitData,
-      };
-
-      fs.writeFileSync(checkpointFile, JSON.stringify(checkpoint, null, 2));
-      await delay(2000);
-    } catch (err) {
-      console.error(`Error saat scraping ${link.href}:`, err);
+  // Tangani sisa <li> di akhir
+  if (listBuffer.length > 0) {
+    if (lastParagraph.endsWith(":")) {
+      paragraphs[
+        paragraphs.length - 1
+      ] = `${lastParagraph} ${listBuffer.join("; ")}`;
+    } else {
+      paragraphs.push(listBuffer.join("; "));
     }
   }
+  return paragraphs;
+}
+
+async function scrapeLink(context, page, link, previous) {
+  const url = fetchUrl(link.href);
+
+  // Request kondisional yang ringan dulu; render penuh (networkidle) hanya jika halaman berubah
+  const headers = {};
+  if (previous && previous.etag) headers["If-None-Match"] = previous.etag;
+  if (previous && previous.lastModified) headers["If-Modified-Since"] = previous.lastModified;
+  await rateLimit();
+  const response = await context.request.get(url, { headers, maxRedirects: 5 });
+  const etag = response.headers()["etag"] || null;
+  const lastModified = response.headers()["last-modified"] || null;
+  if (response.status() === 304) {
+    return { status: "not-modified", etag: etag || previous.etag, lastModified: lastModified || previous.lastModified };
+  }
+  if (!response.ok()) throw new Error(`HTTP ${response.status()}`);
+
+  await rateLimit();
+  await page.goto(url, { waitUntil: "networkidle" });
 
-  fs.writeFileSync(
-    "Data/penyakit-data-raw.json",
-    JSON.stringify(penyakitData, null, 2)
+  // Ambil semua <p> dan <li> sebagai objek {tag, text}
+  const elements = await page.$$eval("p, li", (els) =>
+    els
+      .map((el) => ({
+        tag: el.tagName.toLowerCase(),
+        text: el.innerText.trim(),
+      }))
+      .filter((el) => el.text.length > 0)
+  );
+  const paragraphs = extractParagraphs(elements);
+
+  // Server tanpa ETag/Last-Modified: bandingkan hash isi artikel
+  const hash = contentHash(paragraphs);
+  if (previous && previous.hash === hash) {
+    return { status: "unchanged", etag, lastModified, hash };
+  }
+  return { status: "changed", etag, lastModified, hash, paragraphs };
+}
+
+function writeOutput(latest) {
+  // Satu record per href sesuai urutan links, ditulis ke .tmp lalu di-rename
+  const tmpFile = outputFile + ".tmp";
+  const fd = fs.openSync(tmpFile, "w");
+  let count = 0;
+  for (const link of links) {
+    const record = latest.get(link.href);
+    if (!record) continue;
+    fs.writeSync(fd, JSON.stringify({ name: record.name, href: record.href, paragraphs: record.paragraphs }) + "\n");
+    count++;
+  }
+  fs.closeSync(fd);
+  fs.renameSync(tmpFile, outputFile);
+  return count;
+}
+
+(async () => {
+  const { state, latest } = loadLog();
+  const cutoff = Date.now() - refreshHours * 3600 * 1000;
+  const queue = links.filter((link) => {
+    const checked = state.get(link.href);
+    return !(checked && Date.parse(checked.checkedAt) >= cutoff);
+  });
+  console.log(
+    `${links.length} link, ${links.length - queue.length} sudah dicek < ${refreshHours} jam lalu, ` +
+      `${queue.length} dalam antrean (${concurrency} page, ${ratePerSec} req/detik)`
   );
+
+  const log = fs.createWriteStream(logFile, { flags: "a" });
+  const counts = { changed: 0, unchanged: 0, "not-modified": 0, error: 0 };
+  const started = Date.now();
+  const browser = await chromium.launch();
+
+  // Pool browser: satu context + page per worker, dipakai ulang untuk semua link
+  async function worker(id) {
+    const context = await browser.newContext();
+    const page = await context.newPage();
+    while (queue.length > 0) {
+      const link = queue.shift();
+      const previous = state.get(link.href);
+      for (let attempt = 0; attempt <= maxRetries; attempt++) {
+        try {
+          const result = await scrapeLink(context, page, link, previous);
+          const record = {
+            name: link.name,
+            href: link.href,
+            status: result.status,
+            etag: result.etag,
+            lastModified: result.lastModified,
+            hash: result.hash || (previous && previous.hash) || null,
+            checkedAt: new Date().toISOString(),
+          };
+          if (result.paragraphs) {
+            record.paragraphs = result.paragraphs;
+            latest.set(link.href, record);
+          }
+          log.write(JSON.stringify(record) + "\n");
+          counts[result.status]++;
+          console.log(`[${id}] ${result.status} ${link.name}`);
+          break;
+        } catch (err) {
+          if (attempt === maxRetries) {
+            counts.error++;
+            console.error(`Error saat scraping ${link.href}:`, err.message);
+          } else {
+            await delay(2000 * (attempt + 1));
+          }
+        }
+      }
+    }
+    await context.close();
+  }
+
+  await Promise.all(Array.from({ length: concurrency }, (_, i) => worker(i + 1)));
   await browser.close();
+  await new Promise((res) => log.end(res));
+
+  const total = writeOutput(latest);
+  const seconds = (Date.now() - started) / 1000;
+  console.log(
+    `Selesai dalam ${seconds.toFixed(1)} detik: ${counts.changed} baru/berubah, ` +
+      `${counts.unchanged + counts["not-modified"]} tidak berubah, ${counts.error} error`
+  );
+  console.log(`${total} artikel ditulis ke ${outputFile}`);
 })();
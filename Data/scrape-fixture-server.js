@@ -0,0 +1,94 @@
+// Situs tiruan lokal untuk menguji scrape-data.js tanpa membebani alodokter.com.
+// Pemakaian:
+//   node Data/scrape-fixture-server.js            (buat halaman contoh jika belum ada, lalu serve)
+//   SCRAPE_BASE_URL=http://localhost:8081 SCRAPE_LINKS=Data/fixtures/links.json \
+//   SCRAPE_LOG=Data/fixtures/scrape-log.jsonl SCRAPE_OUTPUT=Data/fixtures/raw.jsonl node Data/scrape-data.js
+const http = require("http");
+const fs = require("fs");
+const path = require("path");
+const crypto = require("crypto");
+
+// Konfigurasi
+const port = parseInt(process.env.FIXTURE_PORT || "8081", 10);
+const siteDir = process.env.FIXTURE_DIR || "Data/fixtures/site";
+const linksFile = process.env.FIXTURE_LINKS || "Data/fixtures/links.json";
+const sourceLinks = "Data/penyakit-links.json";
+const pageCount = parseInt(process.env.FIXTURE_PAGES || "50", 10);
+const delayMs = parseInt(process.env.FIXTURE_DELAY_MS || "100", 10); // Latensi tiruan per request
+const validators = process.env.FIXTURE_VALIDATORS !== "0"; // 0 = tanpa ETag/Last-Modified (uji jalur hash konten)
+
+function generateSite() {
+  // Halaman contoh dengan struktur mirip aslinya: menu (di-blacklist), paragraf, dan daftar <li>
+  const links = JSON.parse(fs.readFileSync(sourceLinks)).slice(0, pageCount);
+  fs.mkdirSync(siteDir, { recursive: true });
+  for (const link of links) {
+    const slug = new URL(link.href).pathname.replace(/^\//, "");
+    const html = `<!doctype html>
+<html><head><meta charset="utf-8"><title>${link.name}</title></head>
+<body>
+<ul><li>Beranda</li><li>Penyakit A-Z</li></ul>
+<p>${link.name} adalah kondisi yang dijelaskan pada halaman contoh ini. Kondisi ini bisa dialami siapa saja.</p>
+<p>Gejala ${link.name} antara lain:</p>
+<ul><li>Demam</li><li>Lemas</li><li>Nyeri</li></ul>
+<p>Segera periksakan diri ke dokter jika gejala tidak membaik.</p>
+<p>Referensi: halaman contoh.</p>
+</body></html>
+`;
+    fs.writeFileSync(path.join(siteDir, `${slug}.html`), html);
+  }
+  fs.mkdirSync(path.dirname(linksFile), { recursive: true });
+  fs.writeFileSync(linksFile, JSON.stringify(links, null, 2));
+  console.log(`${links.length} halaman contoh dibuat di ${siteDir}, daftar link: ${linksFile}`);
+}
+
+if (!fs.existsSync(siteDir)) generateSite();
+
+const counts = { 200: 0, 304: 0, 404: 0 };
+
+const server = http.createServer((req, res) => {
+  const pathname = decodeURIComponent(new URL(req.url, "http://localhost").pathname);
+  const file = path.join(siteDir, path.normalize(pathname).replace(/^(\.\.[/\\])+/, "") + ".html");
+
+  setTimeout(() => {
+    if (!fs.existsSync(file)) {
+      counts[404]++;
+      res.writeHead(404, { "Content-Type": "text/plain" });
+      res.end("not found");
+      return;
+    }
+    const body = fs.readFileSync(file);
+    const stat = fs.statSync(file);
+    const headers = { "Content-Type": "text/html; charset=utf-8" };
+    if (validators) {
+      const etag = `"${crypto.createHash("sha1").update(body).digest("hex")}"`;
+      const lastModified = stat.mtime.toUTCString();
+      headers["ETag"] = etag;
+      headers["Last-Modified"] = lastModified;
+
+      const ifNoneMatch = req.headers["if-none-match"];
+      const ifModifiedSince = req.headers["if-modified-since"];
+      // If-None-Match diutamakan; If-Modified-Since hanya dipakai jika tidak ada ETag dari klien
+      const notModified = ifNoneMatch
+        ? ifNoneMatch === etag
+        : ifModifiedSince && Math.floor(stat.mtimeMs / 1000) * 1000 <= Date.parse(ifModifiedSince);
+      if (notModified) {
+        counts[304]++;
+        res.writeHead(304, headers);
+        res.end();
+        return;
+      }
+    }
+    counts[200]++;
+    res.writeHead(200, headers);
+    res.end(body);
+  }, delayMs);
+});
+
+server.listen(port, () => {
+  console.log(`Situs tiruan di http://localhost:${port} (${siteDir}, validator ${validators ? "aktif" : "mati"})`);
+});
+
+process.on("SIGINT", () => {
+  console.log(`\nRequest: ${counts[200]} x 200, ${counts[304]} x 304, ${counts[404]} x 404`);
+  process.exit(0);
+});
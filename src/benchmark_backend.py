@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import numpy as np
+from stats_util import percentiles
+
+# Konfigurasi
+PERSIST_DIR = './embeddings'
+COLLECTION_NAME = 'penyakit_embeddings'
+BACKENDS = ['chroma', 'numpy']
+NUM_QUERIES = 200
+BATCH_SIZE = 32
+TOP_K = 5
+
+def rss_mb():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def make_queries(collection, n=NUM_QUERIES, seed=0):
+    # Query = vektor yang tersimpan + noise, sama untuk semua backend karena seed tetap
+    stored = np.asarray(collection.get(limit=n, include=['embeddings'])['embeddings'], dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = stored + rng.normal(scale=0.05, size=stored.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def run_worker(backend):
+    # Dijalankan di proses terpisah agar RSS tiap backend tidak saling tercampur
+    from retrieval import open_collection
+
+    base_rss = rss_mb()
+    t0 = time.perf_counter()
+    collection = open_collection(PERSIST_DIR, COLLECTION_NAME, backend)
+    queries = make_queries(collection)
+    collection.query(query_embeddings=queries[:1].tolist(), n_results=TOP_K)  # Pemanasan
+    load_sec = time.perf_counter() - t0
+
+    single_ms = []
+    for query in queries:
+        t = time.perf_counter()
+        collection.query(query_embeddings=[query.tolist()], n_results=TOP_K)
+        single_ms.append((time.perf_counter() - t) * 1000)
+
+    batch_ms = []
+    for start in range(0, len(queries), BATCH_SIZE):
+        batch = queries[start:start + BATCH_SIZE]
+        t = time.perf_counter()
+        collection.query(query_embeddings=batch.tolist(), n_results=TOP_K)
+        batch_ms.append((time.perf_counter() - t) * 1000 / len(batch))
+
+    top_ids = collection.query(query_embeddings=queries.tolist(), n_results=TOP_K, include=['metadatas'])['ids']
+    return {
+        "backend": backend,
+        "chunks": collection.count(),
+        "load_sec": load_sec,
+        "rss_mb": rss_mb() - base_rss,
+        "single_ms": percentiles(single_ms),
+        "batched_ms_per_query": percentiles(batch_ms),
+        "top_ids": top_ids
+    }
+
+def main():
+    reports = []
+    for backend in BACKENDS:
+        print(f"⏳ Benchmark backend {backend}...")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', backend],
+            capture_output=True, text=True, check=True
+        ).stdout
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n📊 {NUM_QUERIES} query, top-{TOP_K}, batch {BATCH_SIZE}\n")
+    print(f"{'backend':<8} {'chunks':>7} {'load s':>7} {'RSS MB':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'batch p50':>10}")
+    for r in reports:
+        print(f"{r['backend']:<8} {r['chunks']:>7} {r['load_sec']:>7.2f} {r['rss_mb']:>7.1f} "
+              f"{r['single_ms']['p50']:>7.2f} {r['single_ms']['p95']:>7.2f} {r['single_ms']['p99']:>7.2f} "
+              f"{r['batched_ms_per_query']['p50']:>10.3f}")
+
+    # HNSW di ChromaDB bersifat aproksimasi, numpy selalu exact
+    base = reports[0]["top_ids"]
+    for r in reports[1:]:
+        overlap = np.mean([len(set(a) & set(b)) / TOP_K for a, b in zip(base, r["top_ids"])])
+        print(f"\n🔁 Overlap top-{TOP_K} {reports[0]['backend']} vs {r['backend']}: {overlap:.3f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        print(json.dumps(run_worker(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import tempfile
+from datetime import datetime
+from jsonstream import iter_json_records
+from chunking import INPUT_FILE, NUM_WORKERS, TOKENIZER_NAME, chunk_records
+from context_packer import count_tokens
+from embedding import EMBED_MODEL, iter_chunks, ingest_chunks, load_model
+from benchmark_retrieval import QUESTIONS_FILE, resolve_expected_hrefs, ranked_hrefs, rank_of, retrieval_metrics
+from stats_util import percentiles
+
+# Konfigurasi
+RESULTS_FILE = 'Data/chunking-benchmark.jsonl'
+TOP_K = 5
+MAX_QUESTIONS = 200  # Latensi diukur per pertanyaan (satu query), seperti di chatbot
+STRATEGIES = [
+    {"name": "paragraph", "strategy": "paragraph"},
+    {"name": "sentence-128", "strategy": "sentence", "target_tokens": 128, "overlap": 1},
+    {"name": "sentence-160", "strategy": "sentence", "target_tokens": 160, "overlap": 1},
+    {"name": "sentence-224", "strategy": "sentence", "target_tokens": 224, "overlap": 1},
+    {"name": "sentence-160-no-overlap", "strategy": "sentence", "target_tokens": 160, "overlap": 0},
+]
+
+def dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+def load_questions(questions_file=QUESTIONS_FILE, limit=MAX_QUESTIONS):
+    with open(questions_file, 'r', encoding='utf-8') as f:
+        items = [item for item in json.load(f) if item.get('question', '').strip()]
+    expected = resolve_expected_hrefs(items)
+    labelled = [(item['question'].strip(), href) for item, href in zip(items, expected) if href]
+    return labelled[:limit]
+
+def run_strategy(config, questions, query_embeddings, input_file=INPUT_FILE, workers=NUM_WORKERS):
+    from chromadb import PersistentClient
+    params = {key: value for key, value in config.items() if key != "name"}
+
+    t0 = time.perf_counter()
+    entries = list(chunk_records(iter_json_records(input_file), workers, **params))
+    chunk_sec = time.perf_counter() - t0
+    chunks = list(iter_chunks(entries))
+    chunk_tokens = [count_tokens(text, TOKENIZER_NAME) for _, text, _ in chunks]
+
+    with tempfile.TemporaryDirectory(prefix='chunk-bench-') as persist_dir:
+        collection = PersistentClient(path=persist_dir).get_or_create_collection(name='bench')
+        embed_stats = ingest_chunks(collection, chunks, total=len(chunks), desc=f"🔄 {config['name']}")
+
+        ranks = []
+        query_ms = []
+        for (_, href), embedding in zip(questions, query_embeddings):
+            t1 = time.perf_counter()
+            result = collection.query(query_embeddings=[embedding], n_results=TOP_K, include=['metadatas'])
+            query_ms.append((time.perf_counter() - t1) * 1000)
+            ranks.append(rank_of(href, ranked_hrefs(result['metadatas'][0])))
+
+        index_bytes = dir_size(persist_dir)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "name": config["name"],
+        "params": params,
+        "model": EMBED_MODEL,
+        "workers": workers,
+        "articles": len(entries),
+        "chunks": len(chunks),
+        "avg_chunk_tokens": sum(chunk_tokens) / len(chunk_tokens) if chunk_tokens else 0.0,
+        "max_chunk_tokens": max(chunk_tokens, default=0),
+        "chunk_sec": chunk_sec,
+        "embed_sec": embed_stats["seconds"],
+        "index_mb": index_bytes / 1e6,
+        "metrics": retrieval_metrics(ranks, TOP_K),
+        "query_ms": percentiles(query_ms)
+    }
+
+def main():
+    questions = load_questions()
+    print(f"\n🧪 {len(questions)} pertanyaan berlabel, top_k={TOP_K}")
+    model = load_model()
+    model.encode("pemanasan")
+    query_embeddings = model.encode([q for q, _ in questions]).tolist()
+
+    reports = []
+    for config in STRATEGIES:
+        reports.append(run_strategy(config, questions, query_embeddings))
+
+    print("\n📊 Strategi chunking\n")
+    print(f"{'strategi':<24} {'chunk':>7} {'tok/chunk':>9} {'index MB':>9} {'chunk s':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'recall@5':>9} {f'mrr@{TOP_K}':>7}")
+    for r in reports:
+        print(f"{r['name']:<24} {r['chunks']:>7} {r['avg_chunk_tokens']:>9.1f} {r['index_mb']:>9.1f} "
+              f"{r['chunk_sec']:>8.2f} {r['query_ms'].get('p50', 0):>7.2f} {r['query_ms'].get('p95', 0):>7.2f} "
+              f"{r['metrics'].get('recall@5', 0):>9.4f} {r['metrics'].get(f'mrr@{TOP_K}', 0):>7.4f}")
+
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        for r in reports:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print(f"\n📁 Hasil ditambahkan ke: {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import math
+import time
+from datetime import datetime
+from retrieval import BACKEND, open_collection, expand_neighbours_batch
+from stats_util import percentiles
+
+# Konfigurasi
+PERSIST_DIR = './embeddings'
+COLLECTION_NAME = 'penyakit_embeddings'
+EMBED_MODEL = 'all-MiniLM-L6-v2'
+QUESTIONS_FILE = 'Data/generated-questions.json'
+LINKS_FILE = 'Data/penyakit-links.json'
+RESULTS_FILE = 'Data/retrieval-benchmark.jsonl'
+TOP_K = 5
+WINDOW = 2
+BATCH_SIZE = 32
+LATENCY_QUESTIONS = 200  # Pertanyaan yang diukur satu per satu untuk p50/p95/p99
+RECALL_AT = (1, 3, 5)
+
+def resolve_expected_hrefs(questions, links_file=LINKS_FILE):
+    # Pakai field "href" jika ada; jika tidak, tebak dari nama penyakit terpanjang yang disebut di pertanyaan
+    with open(links_file, 'r', encoding='utf-8') as f:
+        links = sorted(json.load(f), key=lambda link: len(link['name']), reverse=True)
+
+    resolved = []
+    for item in questions:
+        href = item.get('href')
+        if not href:
+            text = f" {item.get('question', '').lower()} "
+            href = next((
+                link['href'] for link in links
+                if len(link['name']) >= 3 and f" {link['name'].lower()}" in text
+            ), None)
+        resolved.append(href)
+    return resolved
+
+def ranked_hrefs(metadatas):
+    # Ranking tingkat artikel: href pertama kali muncul pada hit ke-berapa
+    seen = []
+    for meta in metadatas:
+        href = meta.get('href')
+        if href and href not in seen:
+            seen.append(href)
+    return seen
+
+def rank_of(expected_href, hrefs):
+    return hrefs.index(expected_href) + 1 if expected_href in hrefs else 0
+
+def retrieval_metrics(ranks, top_k=TOP_K, recall_at=RECALL_AT):
+    n = len(ranks)
+    if not n:
+        return {}
+    metrics = {
+        "questions": n,
+        f"mrr@{top_k}": sum(1.0 / r for r in ranks if 0 < r <= top_k) / n,
+        # Satu dokumen relevan per pertanyaan, jadi IDCG = 1
+        f"ndcg@{top_k}": sum(1.0 / math.log2(r + 1) for r in ranks if 0 < r <= top_k) / n
+    }
+    for k in recall_at:
+        metrics[f"recall@{k}"] = sum(1 for r in ranks if 0 < r <= k) / n
+    return metrics
+
+def run_benchmark(questions_file=QUESTIONS_FILE, top_k=TOP_K, window=WINDOW, batch_size=BATCH_SIZE):
+    from resources import EMBED_BACKEND, load_embed_model
+
+    with open(questions_file, 'r', encoding='utf-8') as f:
+        items = [item for item in json.load(f) if item.get('question', '').strip()]
+
+    expected = resolve_expected_hrefs(items)
+    labelled = [(item['question'].strip(), href) for item, href in zip(items, expected) if href]
+    print(f"\n🧪 {len(labelled)} dari {len(items)} pertanyaan punya href yang diharapkan")
+    if not labelled:
+        return None
+
+    collection = open_collection(PERSIST_DIR, COLLECTION_NAME)
+    embedder = load_embed_model(EMBED_MODEL)
+    embedder.encode("pemanasan")  # Forward pass pertama tidak ikut diukur
+
+    def run_stages(questions):
+        t0 = time.perf_counter()
+        embeddings = embedder.encode(questions, batch_size=len(questions)).tolist()
+        t1 = time.perf_counter()
+        results = collection.query(query_embeddings=embeddings, n_results=top_k, include=['metadatas'])
+        t2 = time.perf_counter()
+        expand_neighbours_batch(collection, results['metadatas'], window)
+        t3 = time.perf_counter()
+        return results, {"encode": (t1 - t0) * 1000, "query": (t2 - t1) * 1000, "window": (t3 - t2) * 1000}
+
+    # Kualitas dihitung per batch (cepat); waktu di sini adalah waktu satu batch utuh
+    ranks = []
+    batch_ms = {"encode": [], "query": [], "window": []}
+    for start in range(0, len(labelled), batch_size):
+        batch = labelled[start:start + batch_size]
+        results, elapsed = run_stages([q for q, _ in batch])
+        for stage, ms in elapsed.items():
+            batch_ms[stage].append(ms)
+        for (_, href), metas in zip(batch, results['metadatas']):
+            ranks.append(rank_of(href, ranked_hrefs(metas)))
+
+    # Latensi ekor per pertanyaan hanya bermakna jika setiap pertanyaan diukur sendiri (batch 1)
+    stage_ms = {"encode": [], "query": [], "window": []}
+    for question, _ in labelled[:LATENCY_QUESTIONS]:
+        _, elapsed = run_stages([question])
+        for stage, ms in elapsed.items():
+            stage_ms[stage].append(ms)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "model": EMBED_MODEL,
+        "embed_backend": EMBED_BACKEND,
+        "collection": COLLECTION_NAME,
+        "backend": BACKEND,
+        "chunks": collection.count(),
+        "top_k": top_k,
+        "window": window,
+        "batch_size": batch_size,
+        "metrics": retrieval_metrics(ranks, top_k),
+        "latency_questions": len(stage_ms["encode"]),
+        "latency_ms": {stage: percentiles(values) for stage, values in stage_ms.items()},
+        "batch_latency_ms": {stage: percentiles(values) for stage, values in batch_ms.items()}
+    }
+
+    print("\n📊 Kualitas retrieval:")
+    for name, value in report["metrics"].items():
+        print(f"  {name:<10} {value:.4f}" if isinstance(value, float) else f"  {name:<10} {value}")
+    print(f"\n⏱️ Latensi per pertanyaan, diukur satu per satu ({report['latency_questions']} pertanyaan, ms):")
+    for stage, values in report["latency_ms"].items():
+        print(f"  {stage:<7} " + "  ".join(f"{p}={v:.2f}" for p, v in values.items()))
+    print(f"\n⏱️ Latensi per batch ({batch_size} pertanyaan per batch, ms):")
+    for stage, values in report["batch_latency_ms"].items():
+        print(f"  {stage:<7} " + "  ".join(f"{p}={v:.2f}" for p, v in values.items()))
+
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    print(f"\n📁 Hasil ditambahkan ke: {RESULTS_FILE}")
+    return report
+
+if __name__ == "__main__":
+    run_benchmark()
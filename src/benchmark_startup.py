@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from datetime import datetime
+
+# Konfigurasi
+RESULTS_FILE = 'Data/startup-benchmark.jsonl'
+QUESTION = 'Apa saja gejala demam berdarah?'
+THINK_SEC = 3.0  # Perkiraan waktu pengguna mengetik pertanyaan pertama (mode warm)
+MODES = ['lazy', 'warm']
+BACKENDS = ['torch', 'onnx', 'onnx-int8']
+REGRESSION_TOLERANCE = 1.2  # Lebih lambat 20% dari run sebelumnya dianggap regresi
+WITH_LLM = os.environ.get('BENCHMARK_LLM', '1') == '1'  # 0 = lewati jawaban LLM (tanpa Ollama)
+
+def run_worker(mode):
+    # Proses baru per pengukuran agar import dan model benar-benar cold
+    t0 = time.perf_counter()
+    import chatbot
+    from resources import warm_up
+    from llm_client import LLMError
+    import_sec = time.perf_counter() - t0
+
+    if mode == 'warm':
+        warm_up(chatbot.embedder, chatbot.collection, chatbot.reranker)
+        time.sleep(THINK_SEC)
+
+    t1 = time.perf_counter()
+    context = chatbot.query_context_with_history(QUESTION, [])
+    first_retrieval_sec = time.perf_counter() - t1
+
+    first_answer_sec = None
+    if WITH_LLM:
+        prompt = chatbot.build_prompt(context, QUESTION, [])
+        try:
+            chatbot.llm.generate(prompt)
+            first_answer_sec = time.perf_counter() - t1
+        except LLMError as e:
+            print(f"⚠️ Jawaban pertama gagal: {e}", file=sys.stderr)
+
+    return {
+        "import_sec": import_sec,
+        "embedder_load_sec": chatbot.embedder.load_seconds(),
+        "collection_load_sec": chatbot.collection.load_seconds(),
+        "reranker_load_sec": chatbot.reranker.load_seconds() if chatbot.reranker is not None else None,
+        # Waktu yang dirasakan pengguna setelah menekan Enter pada pertanyaan pertama
+        "first_retrieval_sec": first_retrieval_sec,
+        "first_answer_sec": first_answer_sec,
+        # Dari start proses sampai konteks pertama siap, tanpa waktu mengetik
+        "cold_start_sec": import_sec + first_retrieval_sec
+    }
+
+def load_previous(file_path=RESULTS_FILE):
+    previous = {}
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                previous[(record["mode"], record["backend"])] = record
+    return previous
+
+def main():
+    previous = load_previous()
+    reports = []
+    for backend in BACKENDS:
+        for mode in MODES:
+            print(f"⏳ Startup {backend} / {mode}...")
+            run = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', mode],
+                capture_output=True, text=True, env={**os.environ, 'EMBED_BACKEND': backend}
+            )
+            if run.returncode != 0:
+                print(f"⚠️ Gagal: {run.stderr.strip().splitlines()[-1] if run.stderr.strip() else run.returncode}")
+                continue
+            reports.append({
+                "timestamp": datetime.now().isoformat(timespec='seconds'),
+                "mode": mode,
+                "backend": backend,
+                **json.loads(run.stdout.strip().splitlines()[-1])
+            })
+
+    def fmt(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    print(f"\n📊 Startup chatbot (detik), pertanyaan: {QUESTION!r}\n")
+    print(f"{'backend':<10} {'mode':<5} {'import':>7} {'embed':>7} {'rerank':>7} {'query #1':>9} {'jawab #1':>9} {'cold':>6}")
+    regressions = []
+    for r in reports:
+        print(f"{r['backend']:<10} {r['mode']:<5} {fmt(r['import_sec']):>7} {fmt(r['embedder_load_sec']):>7} "
+              f"{fmt(r['reranker_load_sec']):>7} {fmt(r['first_retrieval_sec']):>9} {fmt(r['first_answer_sec']):>9} "
+              f"{fmt(r['cold_start_sec']):>6}")
+        before = previous.get((r['mode'], r['backend']))
+        for key in ('cold_start_sec', 'first_retrieval_sec'):
+            if before and before.get(key) and r[key] > before[key] * REGRESSION_TOLERANCE:
+                regressions.append(f"{r['backend']}/{r['mode']} {key}: {before[key]:.2f} -> {r[key]:.2f} detik")
+
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        for r in reports:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print(f"\n📁 Hasil ditambahkan ke: {RESULTS_FILE}")
+
+    if regressions:
+        print("\n⚠️ Regresi dibanding run sebelumnya:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        print(json.dumps(run_worker(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+from collections import Counter
+import numpy as np
+from nltk.tokenize import RegexpTokenizer
+
+# Konfigurasi
+PERSIST_DIR = './embeddings'
+COLLECTION_NAME = 'penyakit_embeddings'
+INDEX_DIR = './embeddings/bm25'
+PAGE_SIZE = 1000
+K1 = 1.2
+B = 0.75
+
+_tokenizer = RegexpTokenizer(r'\w+')
+_stopwords = None
+
+def get_stopwords():
+    global _stopwords
+    if _stopwords is None:
+        try:
+            from nltk.corpus import stopwords
+            _stopwords = set(stopwords.words('indonesian'))
+        except LookupError:
+            print("⚠️ Stopwords bahasa Indonesia belum ada, jalankan: python -m nltk.downloader stopwords")
+            _stopwords = set()
+    return _stopwords
+
+def tokenize(text):
+    stop = get_stopwords()
+    return [token for token in _tokenizer.tokenize(text.lower()) if token not in stop]
+
+def save_atomic(index_dir, name, value):
+    # Tulis ke file baru lalu rename, supaya proses yang sedang mmap file lama tidak rusak
+    path = os.path.join(index_dir, name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        if name.endswith('.npy'):
+            np.save(f, value)
+        else:
+            f.write(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    os.replace(tmp_path, path)
+
+def build_index(collection, index_dir=INDEX_DIR):
+    # Inverted index: postings per term disimpan berurutan dalam satu array, offsets menandai batasnya
+    start = time.perf_counter()
+    docs = {"ids": [], "names": [], "hrefs": [], "chunk_indexes": []}
+    term_postings = {}
+    doc_lens = []
+
+    total = collection.count()
+    for offset in range(0, total, PAGE_SIZE):
+        page = collection.get(limit=PAGE_SIZE, offset=offset, include=['documents', 'metadatas'])
+        for chunk_id, text, meta in zip(page['ids'], page['documents'], page['metadatas']):
+            doc_id = len(docs["ids"])
+            docs["ids"].append(chunk_id)
+            docs["names"].append(meta.get('name'))
+            docs["hrefs"].append(meta.get('href'))
+            docs["chunk_indexes"].append(meta.get('chunk_index'))
+
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_postings.setdefault(term, []).append((doc_id, tf))
+
+    vocab = {}
+    offsets = [0]
+    postings_docs = []
+    postings_tf = []
+    for term_id, term in enumerate(sorted(term_postings)):
+        vocab[term] = term_id
+        for doc_id, tf in term_postings[term]:
+            postings_docs.append(doc_id)
+            postings_tf.append(min(tf, 65535))
+        offsets.append(len(postings_docs))
+
+    n_docs = len(docs["ids"])
+    df = np.diff(np.asarray(offsets, dtype=np.int64))
+    idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    os.makedirs(index_dir, exist_ok=True)
+    save_atomic(index_dir, 'offsets.npy', np.asarray(offsets, dtype=np.int64))
+    save_atomic(index_dir, 'postings_docs.npy', np.asarray(postings_docs, dtype=np.int32))
+    save_atomic(index_dir, 'postings_tf.npy', np.asarray(postings_tf, dtype=np.uint16))
+    save_atomic(index_dir, 'idf.npy', idf)
+    save_atomic(index_dir, 'doc_lens.npy', np.asarray(doc_lens, dtype=np.float32))
+    save_atomic(index_dir, 'vocab.json', vocab)
+    save_atomic(index_dir, 'docs.json', docs)
+
+    print(f"✅ Index BM25: {n_docs} chunk, {len(vocab)} term, {len(postings_docs)} posting "
+          f"({time.perf_counter() - start:.1f} detik) di: {index_dir}")
+
+class BM25Index:
+    def __init__(self, index_dir=INDEX_DIR):
+        # Array besar di-mmap sehingga load cepat dan halaman dibaca sesuai kebutuhan
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode='r')
+        self.offsets = load('offsets.npy')
+        self.postings_docs = load('postings_docs.npy')
+        self.postings_tf = load('postings_tf.npy')
+        self.idf = load('idf.npy')
+        doc_lens = np.load(os.path.join(index_dir, 'doc_lens.npy'))
+        # Bagian normalisasi panjang dokumen dihitung sekali saat load
+        self.length_norm = (K1 * (1 - B + B * doc_lens / max(float(doc_lens.mean()), 1.0))).astype(np.float32)
+        with open(os.path.join(index_dir, 'vocab.json'), 'r', encoding='utf-8') as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(index_dir, 'docs.json'), 'r', encoding='utf-8') as f:
+            self.docs = json.load(f)
+
+    @staticmethod
+    def exists(index_dir=INDEX_DIR):
+        return os.path.exists(os.path.join(index_dir, 'docs.json'))
+
+    def search(self, query, k=10):
+        term_ids = {self.vocab[token] for token in tokenize(query) if token in self.vocab}
+        if not term_ids:
+            return []
+
+        scores = np.zeros(len(self.length_norm), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            doc_ids = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end].astype(np.float32)
+            # Setiap dokumen muncul sekali per posting list, jadi indexing biasa aman
+            scores[doc_ids] += self.idf[term_id] * tf * (K1 + 1) / (tf + self.length_norm[doc_ids])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [{
+            "id": self.docs["ids"][i],
+            "name": self.docs["names"][i],
+            "href": self.docs["hrefs"][i],
+            "chunk_index": self.docs["chunk_indexes"][i],
+            "score": float(scores[i])
+        } for i in top]
+
+if __name__ == "__main__":
+    from chromadb import PersistentClient
+
+    client = PersistentClient(path=PERSIST_DIR)
+    build_index(client.get_or_create_collection(name=COLLECTION_NAME))
+
+    index = BM25Index()
+    for query in ["Amenore", "gejala demam berdarah"]:
+        t0 = time.perf_counter()
+        hits = index.search(query, k=5)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"\n🔎 {query} ({elapsed:.2f} ms)")
+        for hit in hits:
+            print(f"  {hit['score']:.2f}  {hit['name']} - {hit['id']}")
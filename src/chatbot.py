@@ -1,85 +1,113 @@
-import os
-import json
-import requests
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+import time
+from retrieval import expand_neighbours, rrf_fuse
+from bm25_index import BM25Index
+from resources import Lazy, lazy_embedder, lazy_collection, warm_up
+from semantic_cache import SemanticCache
+from reranker import Reranker
+from context_packer import TOKEN_BUDGET, get_tokenizer, pack_context
+from conversation import ChatSession, build_user_message
+from llm_client import OllamaClient, LLMError
+from history_store import HistoryStore
+from tracing import tracer, current_trace
 
 # Konfigurasi
 PERSIST_DIR = './embeddings'
 COLLECTION_NAME = 'penyakit_embeddings'
-OLLAMA_URL = 'http://localhost:11434/api/generate'
-MODEL_NAME = 'llama3.2:3b'
 TOP_K = 5
 WINDOW = 2
-TIMEOUT_SEC = 15
-HISTORY_DIR = 'history'
+TIMEOUT_SEC = 15  # Mode stream: batas tunggu token pertama & jeda antar token (host Ollama: lihat llm_client.py)
+STREAM = True
 MAX_HISTORY = 3
+SEMANTIC_CACHE = True
+HYBRID = True  # Gabungkan BM25 + dense jika index BM25 sudah dibangun (python src/bm25_index.py)
+HYBRID_CANDIDATES = 20  # Kandidat per retriever sebelum fusion
+RERANK = True  # Urutkan ulang kandidat dengan cross-encoder (lihat reranker.py)
+RERANK_CANDIDATES = 20
+PACK_CONTEXT = True  # Kalimat utuh per skor retrieval dalam anggaran token (lihat context_packer.py)
+CHAT_MODE = True  # /api/chat dengan riwayat append-only agar KV cache Ollama dipakai ulang (lihat conversation.py)
+WARM_START = True  # Muat model di latar selagi prompt pertama tampil; False = dimuat saat query pertama
 
 # Inisialisasi
-client = PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(name=COLLECTION_NAME)
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-
-history = []
-history_filepath = None
-
-def save_history():
-    if history_filepath and history:
-        with open(history_filepath, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-
-def create_history_file():
-    global history_filepath
-    os.makedirs(HISTORY_DIR, exist_ok=True)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'history_{timestamp}.json'
-    history_filepath = os.path.join(HISTORY_DIR, filename)
-
-def query_context_with_history(question, recent_history, top_k=TOP_K, window=WINDOW):
+# Model embedding, cross-encoder dan ChromaDB baru dimuat saat pertama dipakai (lihat resources.py)
+collection = lazy_collection(PERSIST_DIR, COLLECTION_NAME)
+embedder = lazy_embedder()
+answer_cache = SemanticCache()
+bm25_index = BM25Index() if HYBRID and BM25Index.exists() else None
+reranker = Lazy(Reranker, "reranker") if RERANK else None
+packer_tokenizer = Lazy(get_tokenizer, "tokenizer context packer")  # Bisa mengunduh dari hub saat pertama dipakai
+llm = OllamaClient(read_timeout=TIMEOUT_SEC)
+chat_session = ChatSession(client=llm) if CHAT_MODE else None
+
+history_store = Lazy(HistoryStore, "history_store")  # history/history.db baru dibuat saat pertama dipakai
+
+history = []  # Hanya MAX_HISTORY giliran terakhir; riwayat lengkap ada di history_store
+session_id = None
+
+def combine_query_text(question, recent_history):
     texts_to_embed = [turn['question'] for turn in recent_history[-2:]] + [question]
-    combined_text = " ".join(texts_to_embed)
+    return " ".join(texts_to_embed)
+
+def embed_query(question, recent_history):
+    with tracer.span("encode"):
+        return embedder.encode(combine_query_text(question, recent_history)).tolist()
+
+def query_context_with_history(question, recent_history, top_k=TOP_K, window=WINDOW, embedding=None):
+    start = time.perf_counter()
+    if embedding is None:
+        embedding = embed_query(question, recent_history)
+    n_candidates = RERANK_CANDIDATES if reranker is not None else top_k
+    n_results = max(n_candidates, HYBRID_CANDIDATES) if bm25_index is not None else n_candidates
+    with tracer.span("query"):
+        results = collection.query(query_embeddings=[embedding], n_results=n_results, include=['documents', 'metadatas'])
+
+    if not results['ids'] or not results['metadatas']:
+        return []
 
-    embedding = embedder.encode(combined_text).tolist()
-    results = collection.query(query_embeddings=[embedding], n_results=top_k)
+    hits = [
+        {**meta, "id": hit_id, "text": doc}
+        for hit_id, doc, meta in zip(results['ids'][0], results['documents'][0], results['metadatas'][0])
+    ]
+    if bm25_index is not None:
+        # Nama penyakit yang persis (mis. "Amenore") sering terlewat oleh model embedding bahasa Inggris
+        with tracer.span("bm25"):
+            sparse = bm25_index.search(combine_query_text(question, recent_history), HYBRID_CANDIDATES)
+        hits = rrf_fuse([hits, sparse], n_candidates)
+
+    if reranker is not None:
+        # Kandidat yang hanya ditemukan BM25 belum membawa teks
+        missing = [hit['id'] for hit in hits if not hit.get('text')]
+        if missing:
+            with tracer.span("fetch"):
+                fetched = collection.get(ids=missing, include=['documents'])
+            texts = dict(zip(fetched['ids'], fetched['documents']))
+            hits = [{**hit, "text": hit.get('text') or texts.get(hit['id'], '')} for hit in hits]
+        with tracer.span("rerank"):
+            hits = reranker.rerank(question, hits, top_k, spent_ms=(time.perf_counter() - start) * 1000)
+
+    with tracer.span("expand"):
+        return expand_neighbours(collection, hits[:top_k], window)
+
+
+def build_context_block(context_docs, pack_stats=None):
+    if PACK_CONTEXT:
+        context_block, stats = pack_context(context_docs, TOKEN_BUDGET)
+        if pack_stats is not None:
+            pack_stats.update(stats)
+        return context_block
 
-    if not results['documents'] or not results['metadatas']:
-        return []
+    context_lines = []
+    for i, doc in enumerate(context_docs, 1):
+        snippet = doc['text'][:300].replace('\n', ' ').strip()
+        context_lines.append(f"[{i}] {doc['name']} - {doc['href']}\n{snippet}\n")
+    return "\n".join(context_lines)
 
-    unique_chunks = {}
-    for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-        idx = meta.get('chunk_index')
-        href = meta.get('href')
-        name = meta.get('name')
-
-        related = collection.get(where={"href": href})
-        docs = related['documents']
-        metas = related['metadatas']
-
-        for offset in range(-window, window + 1):
-            j = idx + offset
-            if 0 <= j < len(docs):
-                key = (href, metas[j]['chunk_index'])
-                if key not in unique_chunks:
-                    unique_chunks[key] = {
-                        "name": name,
-                        "href": href,
-                        "text": docs[j].strip()
-                    }
-    return list(unique_chunks.values())
-
-
-def build_prompt(context_docs, question, recent_history):
+def build_prompt(context_docs, question, recent_history, pack_stats=None):
     if not context_docs:
         question_clean = ''.join(c for c in question if c.isalnum() or c.isspace()).strip()
         return f"Maaf, saya tidak memiliki informasi yang cukup tentang {question_clean}"
 
     # Buat blok konteks
-    context_lines = []
-    for i, doc in enumerate(context_docs, 1):
-        snippet = doc['text'][:300].replace('\n', ' ').strip()
-        context_lines.append(f"[{i}] {doc['name']} - {doc['href']}\n{snippet}\n")
-    context_block = "\n".join(context_lines)
+    context_block = build_context_block(context_docs, pack_stats)
 
     # Buat dialog history natural
     history_lines = []
@@ -106,20 +134,51 @@ Assistant:
 
     return prompt
 
-def ask_llama(prompt):
-    try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False
-        }, timeout=TIMEOUT_SEC)
-
-        if response.status_code == 200:
-            return response.json().get("response", "").strip()
-        else:
-            return f"⚠️ Error {response.status_code}: {response.text}"
-    except Exception as e:
-        return f"⚠️ Gagal menghubungi LLaMA: {str(e)}"
+def generate_answer(prompt, chat=False, question=None):
+    # Melempar LLMError jika Ollama gagal; jawaban parsial yang sudah tercetak tidak disimpan
+    if chat:
+        tokens = chat_session.ask_stream(prompt, question)
+    elif STREAM:
+        tokens = llm.generate_stream(prompt)
+    else:
+        tokens = [llm.generate(prompt)]
+
+    if STREAM:
+        print("🤖 Jawaban:")
+        answer = print_stream(tokens)
+    else:
+        answer = "".join(tokens).strip()
+        print("🤖 Jawaban:\n" + answer + "\n")
+
+    metric = llm.last_metrics()
+    if metric:
+        print(f"🧠 Prompt dievaluasi: {metric['prompt_eval_count']} token ({metric['prompt_eval_ms']:.0f} ms), "
+              f"jawaban {metric['eval_count']} token ({metric['eval_ms']:.0f} ms)\n")
+    return answer
+
+def print_stream(tokens):
+    # Cetak token saat tiba, kembalikan jawaban lengkap dan time-to-first-token
+    start = time.perf_counter()
+    ttft = None
+    parts = []
+    for token in tokens:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+            token = token.lstrip()
+        print(token, end="", flush=True)
+        parts.append(token)
+    print("\n")
+
+    total = time.perf_counter() - start
+    if ttft is not None:
+        print(f"⏱️ Token pertama: {ttft:.2f} detik | Total: {total:.2f} detik\n")
+    return "".join(parts).strip()
+
+def format_stages(trace):
+    # Ringkasan satu giliran, mis. "encode 12 ms | query 8 ms | rerank 95 ms | ..."
+    values = trace["values"]
+    stages = [name for name in values if name.endswith("_ms") and not name.startswith(("llm_", "ollama_"))]
+    return "⏱️ Tahap: " + " | ".join(f"{name[:-3]} {values[name]:.0f} ms" for name in stages)
 
 def show_references(context_docs):
     # Filter supaya setiap href hanya muncul sekali
@@ -135,36 +194,96 @@ def start_chat():
     print("\n🩺 Chatbot Kesehatan Alodokter")
     print("Ketik 'exit' untuk keluar.\n")
 
-    create_history_file()
+    global session_id
+    session_id = history_store.new_session_id()
+    if WARM_START:
+        warm_up(embedder, collection, reranker, packer_tokenizer)
 
     while True:
         question = input("❓ Pertanyaan: ").strip()
         if question.lower() in ['exit', 'quit']:
             print("👋 Sampai jumpa!\n")
-            save_history()
+            if SEMANTIC_CACHE:
+                stats = answer_cache.stats()
+                print(f"🗃️ Cache: {stats['hits']} hit / {stats['misses']} miss "
+                      f"({stats['hit_rate']:.0%}), hemat {stats['saved_latency_sec']:.1f} detik\n")
+            if chat_session is not None and chat_session.turn_stats:
+                stats = chat_session.summary()
+                print(f"🧠 Prompt dievaluasi: {stats['prompt_eval_tokens']} token dalam {stats['turns']} giliran "
+                      f"(rata-rata {stats['avg_prompt_eval_tokens']:.0f} token, {stats['avg_prompt_eval_ms']:.0f} ms)\n")
+            stats = tracer.stats()
+            if "turn_ms" in stats:
+                print("⏱️ Latensi per tahap (ms): " + " | ".join(
+                    f"{name[:-3]} p50={summary['p50']:.0f} p95={summary['p95']:.0f}"
+                    for name, summary in stats.items() if name.endswith("_ms") and not name.startswith("ollama_")
+                ) + "\n")
+            history_store.close()
             break
 
         if not question:
             continue
 
         print("🤖 Sedang mencari jawaban...\n")
-        context = query_context_with_history(question, history[-MAX_HISTORY:])
-        prompt = build_prompt(context, question, history[-MAX_HISTORY:])
-
-        if prompt.startswith("Maaf, saya tidak memiliki informasi"):
-            answer = prompt
-        else:
-            answer = ask_llama(prompt)
-
-        print("🤖 Jawaban:\n" + answer + "\n")
-
-        if context:
-            print("📚 Referensi:")
-            print(show_references(context))
-            print()
-
-        history.append({"question": question, "answer": answer})
-        save_history()
+        with tracer.trace("turn", session_id=session_id):
+            recent_history = history[-MAX_HISTORY:]
+            start = time.perf_counter()
+            embedding = embed_query(question, recent_history)
+            with tracer.span("cache_lookup"):
+                cached = answer_cache.lookup(embedding) if SEMANTIC_CACHE else None
+
+            if cached:
+                context = cached['context']
+                answer = cached['answer']
+                print(f"🤖 Jawaban (cache, kemiripan {cached['similarity']:.2f}):\n" + answer + "\n")
+                if chat_session is not None:
+                    chat_session.append_turn(question, answer)
+            else:
+                context = query_context_with_history(question, recent_history, embedding=embedding)
+                if reranker is not None and reranker.last:
+                    if reranker.last['skipped']:
+                        print("🔀 Rerank dilewati (anggaran waktu habis)\n")
+                    else:
+                        print(f"🔀 Rerank {reranker.last['scored']}/{reranker.last['candidates']} kandidat "
+                              f"dalam {reranker.last['ms']:.0f} ms\n")
+                pack_stats = {}
+                use_chat = chat_session is not None and bool(context)
+                with tracer.span("prompt"):
+                    if use_chat:
+                        # Riwayat sudah ada di chat_session, cukup konteks + pertanyaan giliran ini
+                        prompt = build_user_message(build_context_block(context, pack_stats), question)
+                    else:
+                        prompt = build_prompt(context, question, recent_history, pack_stats)
+                if pack_stats:
+                    print(f"✂️ Konteks: {pack_stats['packed_tokens']} token dari {pack_stats['chunks']} chunk "
+                          f"(hemat {pack_stats['saved_tokens']} token)\n")
+
+                if prompt.startswith("Maaf, saya tidak memiliki informasi"):
+                    answer = prompt
+                    print("🤖 Jawaban:\n" + answer + "\n")
+                    if chat_session is not None:
+                        chat_session.append_turn(question, answer)
+                else:
+                    try:
+                        with tracer.span("generate"):
+                            answer = generate_answer(prompt, use_chat, question)
+                    except LLMError as e:
+                        # Error tidak masuk riwayat maupun cache; pengguna bisa bertanya ulang
+                        print(f"\n⚠️ Gagal mendapat jawaban dari LLaMA: {e}\n")
+                        continue
+
+                    if SEMANTIC_CACHE and context and answer:
+                        answer_cache.store(embedding, context, answer, time.perf_counter() - start)
+
+            if context:
+                print("📚 Referensi:")
+                print(show_references(context))
+                print()
+
+            # Satu baris per giliran, bukan menulis ulang seluruh riwayat
+            history.append({"question": question, "answer": answer})
+            del history[:-MAX_HISTORY]
+            history_store.append(session_id, question, answer)
+            print(format_stages(current_trace()) + "\n")
 
 if __name__ == "__main__":
     start_chat()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 from chromadb import PersistentClient
 
 # Inisialisasi client dengan path direktori penyimpanan
@@ -7,4 +8,9 @@ client = PersistentClient(path="./embeddings")  # Sesuaikan dengan path kamu
 collection_name = "penyakit_embeddings"
 client.delete_collection(name=collection_name)
 
+# Manifest reindex tidak lagi sesuai dengan collection yang sudah dihapus
+manifest_path = os.path.join("./embeddings", "manifest.json")
+if os.path.exists(manifest_path):
+    os.remove(manifest_path)
+
 print(f"✅ Collection '{collection_name}' berhasil dihapus.")
@@ -1,32 +1,188 @@
-import json
+import os
+import re
+import time
+import bisect
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from jsonstream import iter_json_records, write_records
+from context_packer import CHARS_PER_TOKEN, count_tokens, get_tokenizer
 
 # Path input dan output
 INPUT_FILE = 'Data/penyakit-data-processed.json'
 OUTPUT_FILE = 'Data/penyakit-data-chunked.json'
 
-def chunk_data(input_path, output_path):
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+# Konfigurasi
+STRATEGY = os.environ.get('CHUNK_STRATEGY', 'sentence')  # 'sentence' atau 'paragraph' (satu paragraf = satu chunk, cara lama)
+TOKENIZER_NAME = os.environ.get('CHUNK_TOKENIZER', 'sentence-transformers/all-MiniLM-L6-v2')  # Tokenizer model embedding
+TARGET_TOKENS = 160  # Ukuran chunk yang dituju
+MIN_TOKENS = 48  # Paragraf/chunk lebih pendek dari ini digabung dengan tetangganya
+MAX_TOKENS = 256  # Batas input all-MiniLM-L6-v2, sisa teks di atas ini tidak ikut ter-embed
+OVERLAP_SENTENCES = 1  # Kalimat terakhir chunk sebelumnya diulang di awal chunk berikutnya (dalam satu paragraf)
+PARAGRAPH_SEP = '\n'  # Pemisah paragraf pada teks artikel, acuan offset char_start/char_end
+NUM_WORKERS = int(os.environ.get('CHUNK_WORKERS', '0'))  # >0 = chunking di process pool
+POOL_WINDOW = 256  # Artikel per putaran pool, agar memori tetap konstan
+POOL_CHUNKSIZE = 16
 
-    chunked_data = []
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+_LAST_SPACE = re.compile(r'.*\s', re.S)
+_punkt = None
 
-    for entry in data:
-        name = entry["name"]
-        href = entry["href"]
-        paragraphs = entry["paragraphs"]
+def get_punkt():
+    # Punkt tidak punya model bahasa Indonesia; model English tetap memotong di titik/tanda tanya
+    # dan mengenali singkatan umum. False = data belum diunduh, pakai regex
+    global _punkt
+    if _punkt is None:
+        try:
+            from nltk.tokenize import PunktTokenizer
+            _punkt = PunktTokenizer('english')
+        except LookupError:
+            print("⚠️ Model punkt belum ada, jalankan: python -m nltk.downloader punkt_tab")
+            _punkt = False
+    return _punkt
 
-        chunks = [p.strip() for p in paragraphs if p.strip()]
+def sentence_spans(text):
+    # (start, end) setiap kalimat di dalam text
+    punkt = get_punkt()
+    if punkt:
+        return list(punkt.span_tokenize(text))
 
-        chunked_data.append({
-            "name": name,
-            "href": href,
-            "chunks": chunks
-        })
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(chunked_data, f, ensure_ascii=False, indent=2)
+def split_long(text, start, end, max_tokens, tokenizer_name=TOKENIZER_NAME):
+    # Potong text[start:end] menjadi bagian <= max_tokens: di spasi terakhir sebelum batas token,
+    # atau tepat di batas token jika tidak ada spasi (mis. URL panjang)
+    tokenizer = get_tokenizer(tokenizer_name)
+    if tokenizer is None:
+        token_starts = list(range(start, end, CHARS_PER_TOKEN))
+    else:
+        token_starts = [start + s for s, _ in tokenizer.encode(text[start:end], add_special_tokens=False).offsets]
 
-    print(f"✅ Chunking selesai. Data disimpan di: {output_path}")
+    spans = []
+    while start < end:
+        i = bisect.bisect_left(token_starts, start)
+        if len(token_starts) - i <= max_tokens:
+            spans.append((start, end))
+            break
+        limit = token_starts[i + max_tokens]
+        space = _LAST_SPACE.match(text, start + 1, limit)
+        cut = space.end() if space else limit
+        piece_end = cut
+        while piece_end > start and text[piece_end - 1].isspace():
+            piece_end -= 1
+        spans.append((start, piece_end))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    return spans
+
+def split_units(paragraphs, tokenizer_name=TOKENIZER_NAME, target_tokens=TARGET_TOKENS, max_tokens=MAX_TOKENS):
+    # Kalimat dari semua paragraf dengan offset terhadap teks artikel (paragraf digabung PARAGRAPH_SEP).
+    # Kalimat di atas max_tokens (mis. paragraf panjang tanpa titik) dipecah ke bagian <= target_tokens,
+    # karena sisa di atas batas model tidak akan ikut ter-embed
+    units = []
+    offset = 0
+    for p_idx, paragraph in enumerate(paragraphs):
+        for start, end in sentence_spans(paragraph):
+            tokens = count_tokens(paragraph[start:end], tokenizer_name)
+            spans = [(start, end)]
+            if tokens > max_tokens:
+                spans = split_long(paragraph, start, end, target_tokens, tokenizer_name)
+            for piece_start, piece_end in spans:
+                units.append({
+                    "paragraph": p_idx,
+                    "start": offset + piece_start,
+                    "end": offset + piece_end,
+                    "tokens": tokens if len(spans) == 1 else count_tokens(paragraph[piece_start:piece_end], tokenizer_name)
+                })
+        offset += len(paragraph) + len(PARAGRAPH_SEP)
+    return units
+
+def group_units(units, target_tokens=TARGET_TOKENS, min_tokens=MIN_TOKENS, max_tokens=MAX_TOKENS,
+                overlap=OVERLAP_SENTENCES):
+    # Isi chunk kalimat demi kalimat sampai target; pindah paragraf hanya jika chunk sudah
+    # cukup panjang, sehingga paragraf pendek tergabung dengan paragraf berikutnya
+    groups = []
+    current = []
+    tokens = 0
+    for unit in units:
+        new_paragraph = current and unit["paragraph"] != current[-1]["paragraph"]
+        if current and (tokens + unit["tokens"] > target_tokens or (new_paragraph and tokens >= min_tokens)):
+            groups.append(current)
+            # Overlap hanya di dalam paragraf yang sama; antar paragraf topiknya biasanya sudah berganti
+            carry = [] if new_paragraph else current[-overlap:] if overlap else []
+            if sum(u["tokens"] for u in carry) + unit["tokens"] > target_tokens:
+                carry = []
+            current = list(carry)
+            tokens = sum(u["tokens"] for u in carry)
+        current.append(unit)
+        tokens += unit["tokens"]
+
+    if current:
+        # Ekor yang terlalu pendek ditempel ke chunk sebelumnya selama masih muat di model
+        tail = [u for u in current if not groups or u["start"] >= groups[-1][-1]["end"]]
+        if groups and tokens < min_tokens and sum(u["tokens"] for u in groups[-1] + tail) <= max_tokens:
+            groups[-1].extend(tail)
+        else:
+            groups.append(current)
+    return groups
+
+def chunk_entry(entry, strategy=STRATEGY, target_tokens=TARGET_TOKENS, min_tokens=MIN_TOKENS,
+                overlap=OVERLAP_SENTENCES, tokenizer_name=TOKENIZER_NAME):
+    name = entry["name"]
+    href = entry["href"]
+    paragraphs = [p.strip() for p in entry["paragraphs"] if p.strip()]
+    text = PARAGRAPH_SEP.join(paragraphs)
+
+    if strategy == 'paragraph':
+        offsets = []
+        offset = 0
+        for paragraph in paragraphs:
+            offsets.append([offset, offset + len(paragraph)])
+            offset += len(paragraph) + len(PARAGRAPH_SEP)
+    else:
+        groups = group_units(split_units(paragraphs, tokenizer_name, target_tokens), target_tokens, min_tokens,
+                             overlap=overlap)
+        offsets = [[group[0]["start"], group[-1]["end"]] for group in groups]
+
+    # Setiap chunk adalah potongan utuh teks artikel, jadi offset bisa dipakai untuk menyorot sumber
+    return {
+        "name": name,
+        "href": href,
+        "chunks": [text[start:end] for start, end in offsets],
+        "offsets": offsets
+    }
+
+def chunk_records(records, workers=NUM_WORKERS, **params):
+    # Chunking di process pool, per jendela POOL_WINDOW artikel agar input tetap di-stream
+    func = partial(chunk_entry, **params)
+    if workers <= 0:
+        yield from map(func, records)
+        return
+
+    window = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for record in records:
+            window.append(record)
+            if len(window) >= POOL_WINDOW:
+                yield from pool.map(func, window, chunksize=POOL_CHUNKSIZE)
+                window = []
+        if window:
+            yield from pool.map(func, window, chunksize=POOL_CHUNKSIZE)
+
+def chunk_data(input_path, output_path, workers=NUM_WORKERS):
+    start = time.perf_counter()
+    count = write_records(chunk_records(iter_json_records(input_path), workers), output_path)
+
+    print(f"✅ Chunking selesai ({count} artikel, strategi {STRATEGY}, {time.perf_counter() - start:.1f} detik). "
+          f"Data disimpan di: {output_path}")
 
 if __name__ == "__main__":
     chunk_data(INPUT_FILE, OUTPUT_FILE)
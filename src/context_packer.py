@@ -0,0 +1,123 @@
+import os
+import re
+
+# Konfigurasi
+TOKENIZER_NAME = os.environ.get('PACKER_TOKENIZER', 'unsloth/Llama-3.2-3B-Instruct')  # Tokenizer llama3.2 (tanpa gating)
+TOKEN_BUDGET = 600  # Maksimal token untuk blok konteks
+NEIGHBOUR_DECAY = 0.5  # Skor chunk tetangga = skor hit x decay^jarak
+CHARS_PER_TOKEN = 4  # Perkiraan jika tokenizer tidak tersedia
+LEGACY_SNIPPET_CHARS = 300  # Potongan per chunk pada build_prompt lama, untuk menghitung penghematan
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+_tokenizers = {}
+
+def get_tokenizer(name=TOKENIZER_NAME):
+    # None berarti fallback ke perkiraan CHARS_PER_TOKEN
+    if name not in _tokenizers:
+        try:
+            from tokenizers import Tokenizer
+            if os.path.exists(name):
+                _tokenizers[name] = Tokenizer.from_file(name)
+            else:
+                _tokenizers[name] = Tokenizer.from_pretrained(name)
+        except Exception as e:
+            print(f"⚠️ Tokenizer {name} tidak bisa di-load ({e}), token dihitung dari jumlah karakter")
+            _tokenizers[name] = None
+    return _tokenizers[name]
+
+def count_tokens(text, tokenizer_name=TOKENIZER_NAME):
+    tokenizer = get_tokenizer(tokenizer_name)
+    if tokenizer is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text.replace('\n', ' ')) if s.strip()]
+
+def chunk_score(doc):
+    # Hit peringkat 1 bernilai 1.0; tetangga yang lebih jauh dari hit bernilai lebih kecil
+    return (1.0 / doc.get('rank', 1)) * NEIGHBOUR_DECAY ** doc.get('distance', 0)
+
+def format_passage(i, name, href, text):
+    return f"[{i}] {name} - {href}\n{text}\n"
+
+def legacy_context(context_docs):
+    # Blok konteks versi lama (setiap chunk dipotong 300 karakter), hanya untuk pembanding
+    return "\n".join(
+        format_passage(i, doc['name'], doc['href'], doc['text'][:LEGACY_SNIPPET_CHARS].replace('\n', ' ').strip())
+        for i, doc in enumerate(context_docs, 1)
+    )
+
+def pack_context(context_docs, budget=TOKEN_BUDGET):
+    # Pilih kalimat utuh dengan skor tertinggi sampai anggaran token habis,
+    # lalu susun kembali per artikel dalam urutan aslinya
+    sentences = []
+    seen = set()
+    for doc in context_docs:
+        score = chunk_score(doc)
+        # Chunk yang overlap berbagi kalimat: duplikat dibuang sebelum posisi dihitung,
+        # sehingga kalimat pertama yang baru tetap dianggap menyambung dengan chunk sebelumnya
+        doc_sentences = []
+        for sentence in split_sentences(doc['text']):
+            key = (doc['href'], sentence)
+            if key not in seen:
+                seen.add(key)
+                doc_sentences.append(sentence)
+        for pos, sentence in enumerate(doc_sentences):
+            sentences.append({
+                "href": doc['href'],
+                "name": doc['name'],
+                "chunk_index": doc.get('chunk_index', 0),
+                "pos": pos,
+                "last": pos == len(doc_sentences) - 1,
+                "score": score,
+                "text": sentence,
+                "tokens": count_tokens(sentence) + 1  # +1 untuk spasi pemisah
+            })
+
+    selected = []
+    used = 0
+    headers = set()
+    # Skor sama: kalimat awal chunk didahulukan
+    for sentence in sorted(sentences, key=lambda s: (-s["score"], s["pos"])):
+        # Artikel baru juga memakai token untuk baris "[i] nama - href"
+        cost = sentence["tokens"]
+        if sentence["href"] not in headers:
+            cost += count_tokens(format_passage(len(headers) + 1, sentence["name"], sentence["href"], ""))
+        if used + cost <= budget:
+            selected.append(sentence)
+            headers.add(sentence["href"])
+            used += cost
+
+    # Chunk bersebelahan dari href yang sama digabung menjadi satu passage
+    articles = {}
+    for sentence in selected:
+        articles.setdefault(sentence["href"], []).append(sentence)
+    ordered = sorted(articles.values(), key=lambda group: -max(s["score"] for s in group))
+
+    passages = []
+    for group in ordered:
+        group.sort(key=lambda s: (s["chunk_index"], s["pos"]))
+        parts = [group[0]["text"]]
+        for prev, sentence in zip(group, group[1:]):
+            contiguous = (
+                sentence["chunk_index"] == prev["chunk_index"] and sentence["pos"] == prev["pos"] + 1
+            ) or (sentence["chunk_index"] == prev["chunk_index"] + 1 and prev["last"] and sentence["pos"] == 0)
+            # Kalimat di antaranya tidak ikut, tandai dengan elipsis
+            parts.append(sentence["text"] if contiguous else "... " + sentence["text"])
+        passages.append((group[0]["name"], group[0]["href"], " ".join(parts)))
+
+    block = "\n".join(format_passage(i, name, href, text) for i, (name, href, text) in enumerate(passages, 1))
+    legacy_tokens = count_tokens(legacy_context(context_docs))
+    packed_tokens = count_tokens(block)
+    stats = {
+        "chunks": len(context_docs),
+        "passages": len(passages),
+        "sentences": len(selected),
+        "candidate_sentences": len(sentences),
+        "candidate_tokens": sum(s["tokens"] for s in sentences),
+        "packed_tokens": packed_tokens,
+        "legacy_tokens": legacy_tokens,
+        "saved_tokens": legacy_tokens - packed_tokens
+    }
+    return block, stats
@@ -0,0 +1,105 @@
+from llm_client import OllamaClient
+from context_packer import count_tokens
+
+# Konfigurasi
+KEEP_ALIVE = '30m'  # Model dan KV cache tetap di memori Ollama selama sesi berjalan
+TIMEOUT_SEC = 15  # Batas jeda antar token
+MAX_TURNS = 6  # Jika lebih, riwayat dipangkas sekaligus ke KEEP_TURNS (prefix hanya berubah sesekali)
+KEEP_TURNS = 3
+HISTORY_TOKEN_BUDGET = 2048  # Riwayat tanya-jawab di atas ini juga memicu pemangkasan
+# Jendela konteks Ollama untuk kasus terburuk: system (~80) + riwayat (HISTORY_TOKEN_BUDGET) + konteks
+# (TOKEN_BUDGET) + pertanyaan, sisa ~1200 token untuk jawaban. Tanpa num_ctx Ollama memakai default-nya
+# dan diam-diam membuang awal prompt, termasuk system prompt dan prefix yang dipakai ulang dari KV cache
+NUM_CTX = 4096
+
+SYSTEM_PROMPT = (
+    "Kamu adalah asisten kesehatan profesional yang ramah dan jelas. Berdasarkan informasi yang diberikan "
+    "bersama setiap pertanyaan, bantu jawab pertanyaan pengguna secara lengkap dan profesional. Gunakan "
+    "riwayat percakapan sebelumnya untuk menjaga kesinambungan dialog."
+)
+
+def build_user_message(context_block, question):
+    # Konteks hanya dikirim bersama pesan giliran ini; di riwayat pesan user disimpan sebagai pertanyaannya saja
+    return f"""
+=== Informasi yang kamu miliki ===
+{context_block}
+=== Akhir Informasi ===
+
+{question}
+""".strip()
+
+class ChatSession:
+    # Urutan pesan: system tetap, lalu riwayat yang hanya ditambah. Ollama mencocokkan prefix
+    # token dengan KV cache dari giliran sebelumnya, jadi hanya pesan baru yang dievaluasi ulang
+    def __init__(self, client=None, system_prompt=SYSTEM_PROMPT, keep_alive=KEEP_ALIVE):
+        self.client = client or OllamaClient(read_timeout=TIMEOUT_SEC)
+        self.keep_alive = keep_alive
+        self.messages = [{"role": "system", "content": system_prompt}]
+        self.turn_stats = []
+
+    def history_tokens(self):
+        return sum(count_tokens(m["content"]) for m in self.messages[1:])
+
+    def _trim(self):
+        # Dipangkas sekaligus (bukan satu giliran per pertanyaan) agar prefix KV cache jarang berubah
+        turns = (len(self.messages) - 1) // 2
+        if turns < MAX_TURNS and self.history_tokens() <= HISTORY_TOKEN_BUDGET:
+            return
+        self.messages = self.messages[:1] + self.messages[1:][-KEEP_TURNS * 2:]
+        while len(self.messages) > 1 and self.history_tokens() > HISTORY_TOKEN_BUDGET // 2:
+            self.messages = self.messages[:1] + self.messages[3:]
+
+    def append_turn(self, question, answer):
+        # Untuk giliran yang dijawab tanpa LLM (cache/fallback) agar riwayat tetap lengkap
+        self._trim()
+        self.messages.append({"role": "user", "content": question})
+        self.messages.append({"role": "assistant", "content": answer})
+
+    def _record(self, metric):
+        # prompt_eval_count = token prompt yang benar-benar dievaluasi (bagian yang tidak ada di KV cache)
+        stats = {
+            "turn": len(self.turn_stats) + 1,
+            "messages": len(self.messages),
+            "prompt_chars": sum(len(m["content"]) for m in self.messages),
+            "prompt_eval_count": metric["prompt_eval_count"],
+            "prompt_eval_ms": metric["prompt_eval_ms"],
+            "eval_count": metric["eval_count"],
+            "ttft_sec": metric["ttft_sec"],
+            "total_sec": metric["latency_sec"]
+        }
+        self.turn_stats.append(stats)
+        return stats
+
+    def ask_stream(self, user_content, question=None):
+        # Yield token jawaban; pesan user + assistant baru disimpan hanya jika jawaban selesai.
+        # user_content (konteks + pertanyaan) hanya dikirim sekali; riwayat menyimpan question saja,
+        # sehingga giliran berikutnya cukup mengevaluasi ulang pesan terakhir, bukan blok konteks lama.
+        # Error dari Ollama dilempar sebagai LLMError dan riwayat tidak berubah
+        self._trim()
+        messages = self.messages + [{"role": "user", "content": user_content}]
+        parts = []
+        for token in self.client.chat_stream(messages, keep_alive=self.keep_alive, options={"num_ctx": NUM_CTX}):
+            parts.append(token)
+            yield token
+        self.messages = self.messages + [
+            {"role": "user", "content": question if question is not None else user_content},
+            {"role": "assistant", "content": "".join(parts).strip()}
+        ]
+        self._record(self.client.last_metrics())
+
+    def ask(self, user_content, question=None):
+        return "".join(self.ask_stream(user_content, question)).strip()
+
+    def last_stats(self):
+        return self.turn_stats[-1] if self.turn_stats else None
+
+    def summary(self):
+        if not self.turn_stats:
+            return {}
+        evaluated = [s["prompt_eval_count"] for s in self.turn_stats]
+        return {
+            "turns": len(self.turn_stats),
+            "prompt_eval_tokens": sum(evaluated),
+            "avg_prompt_eval_tokens": sum(evaluated) / len(evaluated),
+            "avg_prompt_eval_ms": sum(s["prompt_eval_ms"] for s in self.turn_stats) / len(self.turn_stats)
+        }
@@ -1,80 +1,179 @@
-import json
 import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+from jsonstream import iter_json_records
 
 # Konfigurasi
 CHUNKED_FILE = 'Data/penyakit-data-chunked.json'
 PERSIST_DIR = './embeddings'
 COLLECTION_NAME = 'penyakit_embeddings'
-BATCH_SIZE = 1000  # Aman & efisien
+EMBED_MODEL = 'all-MiniLM-L6-v2'
+BATCH_SIZE = 1000  # Jumlah chunk per collection.add, aman & efisien
+ENCODE_BATCH_SIZE = 64  # Jumlah chunk per forward pass model
+DEVICE = None  # None = otomatis (cuda jika tersedia, selain itu cpu)
+NUM_WORKERS = int(os.environ.get('EMBED_WORKERS', '0'))  # >0 = encode di process pool CPU
 
-# Load model ke GPU jika tersedia
-model = SentenceTransformer('all-MiniLM-L6-v2', device='cuda')
+_model = None
 
-def get_embedding(text):
-    return model.encode(text).tolist()
+def resolve_device(device=DEVICE):
+    if device:
+        return device
+    try:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
 
-def embed_to_chromadb():
-    with open(CHUNKED_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def load_model(device=DEVICE):
+    # Model di-load saat pertama dipakai, bukan saat import
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBED_MODEL, device=resolve_device(device))
+    return _model
 
-    client = PersistentClient(path=PERSIST_DIR)
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+def get_embedding(text):
+    return load_model().encode(text).tolist()
 
-    total_chunks = sum(len(entry["chunks"]) for entry in data)
-    print(f"\n🧠 Total chunks: {total_chunks}\n")
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+    load_model('cpu')
 
-    batch_ids = []
-    batch_docs = []
-    batch_embeddings = []
-    batch_metadatas = []
-    total_added = 0
+def _encode_worker(texts):
+    return load_model('cpu').encode(texts, batch_size=ENCODE_BATCH_SIZE).tolist()
 
-    for entry in tqdm(data, desc="🔄 Membuat embedding untuk ChromaDB"):
+def iter_chunks(data):
+    # Hasilkan (id, teks, metadata) untuk setiap chunk yang tidak kosong
+    for entry in data:
         name = entry["name"]
         href = entry["href"]
-        chunks = entry["chunks"]
+        # File chunk lama (satu paragraf per chunk) belum punya offset
+        offsets = entry.get("offsets") or [None] * len(entry["chunks"])
 
-        for idx, chunk in enumerate(chunks):
+        for idx, (chunk, offset) in enumerate(zip(entry["chunks"], offsets)):
             chunk = chunk.strip()
             if not chunk:
                 continue
 
-            chunk_id = f"{href}_{idx}"
-            embedding = get_embedding(chunk)
-
-            batch_ids.append(chunk_id)
-            batch_docs.append(chunk)
-            batch_embeddings.append(embedding)
-            batch_metadatas.append({
+            meta = {
                 "name": name,
                 "href": href,
                 "chunk_index": idx
-            })
-
-            if len(batch_ids) >= BATCH_SIZE:
-                collection.add(
-                    ids=batch_ids,
-                    documents=batch_docs,
-                    embeddings=batch_embeddings,
-                    metadatas=batch_metadatas
-                )
-                total_added += len(batch_ids)
-                batch_ids, batch_docs, batch_embeddings, batch_metadatas = [], [], [], []
-
-    # Tambahkan sisa data yang belum masuk batch
-    if batch_ids:
-        collection.add(
-            ids=batch_ids,
-            documents=batch_docs,
-            embeddings=batch_embeddings,
-            metadatas=batch_metadatas
-        )
-        total_added += len(batch_ids)
-
-    print(f"\n✅ Selesai menyimpan {total_added} embedding ke ChromaDB di: {PERSIST_DIR}")
+            }
+            if offset is not None:
+                # Posisi chunk di teks artikel (paragraf digabung dengan '\n')
+                meta["char_start"], meta["char_end"] = offset
+            yield f"{href}_{idx}", chunk, meta
+
+def iter_batches(items, batch_size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def length_sorted_batches(texts, batch_size=ENCODE_BATCH_SIZE):
+    # Urutkan berdasarkan panjang agar padding di tiap batch minimal
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+class Encoder:
+    def __init__(self, num_workers=NUM_WORKERS, device=DEVICE):
+        self.device = resolve_device(device)
+        self.pool = None
+
+        if num_workers > 0 and self.device == 'cpu':
+            threads = max(1, (os.cpu_count() or 1) // num_workers)
+            self.pool = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(threads,)
+            )
+        else:
+            load_model(self.device)
+
+    def encode(self, texts):
+        if self.pool is None:
+            return load_model(self.device).encode(texts, batch_size=ENCODE_BATCH_SIZE).tolist()
+
+        groups = length_sorted_batches(texts)
+        results = self.pool.map(_encode_worker, [[texts[i] for i in group] for group in groups])
+
+        embeddings = [None] * len(texts)
+        for group, vectors in zip(groups, results):
+            for i, vector in zip(group, vectors):
+                embeddings[i] = vector
+        return embeddings
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+def ingest_chunks(collection, chunks, total=None, encoder=None, method='add', desc="🔄 Membuat embedding untuk ChromaDB"):
+    # Encode batch berikutnya selagi batch sebelumnya ditulis ke ChromaDB
+    own_encoder = encoder is None
+    encoder = encoder or Encoder()
+    write = getattr(collection, method)
+    writer = ThreadPoolExecutor(max_workers=1)
+    pending = None
+    total_added = 0
+    encode_sec = 0.0
+    start = time.perf_counter()
+
+    try:
+        with tqdm(total=total, desc=desc, unit="chunk") as progress:
+            for batch in iter_batches(chunks):
+                ids = [item[0] for item in batch]
+                docs = [item[1] for item in batch]
+                metas = [item[2] for item in batch]
+
+                t0 = time.perf_counter()
+                embeddings = encoder.encode(docs)
+                encode_sec += time.perf_counter() - t0
+
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(write, ids=ids, documents=docs, embeddings=embeddings, metadatas=metas)
+
+                total_added += len(batch)
+                progress.update(len(batch))
+                progress.set_postfix(encode=f"{total_added / encode_sec:.0f}/s" if encode_sec else "-")
+
+        if pending is not None:
+            pending.result()
+    finally:
+        writer.shutdown()
+        if own_encoder:
+            encoder.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "chunks": total_added,
+        "seconds": elapsed,
+        "chunks_per_sec": total_added / elapsed if elapsed else 0.0,
+        "encode_chunks_per_sec": total_added / encode_sec if encode_sec else 0.0
+    }
+
+def embed_to_chromadb():
+    from chromadb import PersistentClient
+
+    client = PersistentClient(path=PERSIST_DIR)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    # File chunk dibaca bertahap, bukan json.load sekaligus (lihat ingest_pipeline.py untuk raw -> Chroma langsung)
+    stats = ingest_chunks(collection, iter_chunks(iter_json_records(CHUNKED_FILE)))
+
+    print(f"\n✅ Selesai menyimpan {stats['chunks']} embedding ke ChromaDB di: {PERSIST_DIR}")
+    print(f"⏱️ {stats['seconds']:.1f} detik | {stats['chunks_per_sec']:.1f} chunk/detik "
+          f"(encode saja: {stats['encode_chunks_per_sec']:.1f} chunk/detik)")
 
 if __name__ == "__main__":
     embed_to_chromadb()
@@ -0,0 +1,154 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Konfigurasi
+MAX_ENTRIES = 4096  # Kapasitas tier LRU di memori
+DISK_DIR = './embeddings/query_cache'
+DISK_CAPACITY = 100_000  # Jumlah vektor maksimal di tier disk (ring buffer)
+IGNORED_KWARGS = ('batch_size', 'show_progress_bar', 'convert_to_numpy')  # Tidak mengubah vektor hasil
+UNCACHED_KWARGS = ('convert_to_tensor', 'output_value')  # Hasilnya bukan satu vektor numpy per teks
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+class DiskTier:
+    # vectors.f32 = matriks float32 (capacity x dim) yang di-mmap, keys.tsv = log append-only "key<TAB>slot"
+    # yang dipadatkan setiap kali ring buffer kembali ke slot 0, jadi paling banyak ~2x capacity baris
+    def __init__(self, directory, dim, capacity=DISK_CAPACITY):
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        vectors_path = os.path.join(directory, 'vectors.f32')
+        mode = 'r+' if os.path.exists(vectors_path) else 'w+'
+        self.vectors = np.memmap(vectors_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+
+        self.slots = {}
+        self.slot_keys = {}
+        self.next_slot = 0
+        self.keys_path = os.path.join(directory, 'keys.tsv')
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, _, slot = line.rstrip('\n').partition('\t')
+                    if slot.isdigit() and int(slot) < capacity:
+                        self._assign(key, int(slot))
+                        self.next_slot = (int(slot) + 1) % capacity
+        self.keys_file = open(self.keys_path, 'a', encoding='utf-8')
+
+    def _assign(self, key, slot):
+        old_key = self.slot_keys.get(slot)
+        if old_key is not None:
+            self.slots.pop(old_key, None)
+        self.slots[key] = slot
+        self.slot_keys[slot] = key
+
+    def get(self, key):
+        slot = self.slots.get(key)
+        return None if slot is None else np.array(self.vectors[slot])
+
+    def put(self, key, vector):
+        slot = self.next_slot
+        self.vectors[slot] = vector
+        self._assign(key, slot)
+        self.keys_file.write(f"{key}\t{slot}\n")
+        self.next_slot = (slot + 1) % self.capacity
+        if self.next_slot == 0:
+            self._compact()
+
+    def _compact(self):
+        # Tulis ulang log hanya dengan pasangan yang masih berlaku, urut slot, sehingga next_slot
+        # hasil pembacaan ulang tetap sama; .tmp + os.replace agar log lama utuh jika proses mati
+        self.keys_file.close()
+        with open(self.keys_path + '.tmp', 'w', encoding='utf-8') as f:
+            for slot in sorted(self.slot_keys):
+                f.write(f"{self.slot_keys[slot]}\t{slot}\n")
+        os.replace(self.keys_path + '.tmp', self.keys_path)
+        self.keys_file = open(self.keys_path, 'a', encoding='utf-8')
+
+    def flush(self):
+        self.vectors.flush()
+        self.keys_file.flush()
+
+class EmbeddingCache:
+    # Pembungkus model.encode: teks yang pernah di-encode tidak melewati transformer lagi
+    def __init__(self, model, model_name, max_entries=MAX_ENTRIES, disk_dir=None, disk_capacity=DISK_CAPACITY):
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk = None
+        if disk_dir:
+            safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+            dim = model.get_sentence_embedding_dimension()
+            self.disk = DiskTier(os.path.join(disk_dir, safe_name), dim, disk_capacity)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text, options=""):
+        # options = kwargs encode yang memengaruhi vektor (mis. normalize_embeddings), ikut jadi bagian key
+        prefix = f"{self.model_name}\0{options}" if options else self.model_name
+        return hashlib.sha1(f"{prefix}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def encode(self, texts, **kwargs):
+        if any(kwargs.get(name) for name in UNCACHED_KWARGS):
+            return self.model.encode(texts, **kwargs)
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        options = sorted((k, v) for k, v in kwargs.items() if k not in IGNORED_KWARGS)
+        options = repr(options) if options else ""
+        keys = [self._key(text, options) for text in texts]
+        vectors = [None] * len(texts)
+
+        with self.lock:
+            for i, key in enumerate(keys):
+                vector = self.memory.get(key)
+                if vector is None and self.disk is not None:
+                    vector = self.disk.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    vectors[i] = vector
+
+            # Teks yang sama dalam satu batch cukup di-encode sekali
+            missing = {}
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    missing.setdefault(keys[i], normalize_text(texts[i]))
+
+            # Dihitung di dalam lock karena cache dipakai bersama thread server
+            self.hits += len(texts) - sum(1 for v in vectors if v is None)
+            self.misses += len(missing)
+
+        if missing:
+            encoded = self.model.encode(list(missing.values()), **kwargs)
+            fresh = {}
+            with self.lock:
+                for key, vector in zip(missing, encoded):
+                    fresh[key] = np.asarray(vector, dtype=np.float32)
+                    self._remember(key, fresh[key])
+                    if self.disk is not None:
+                        self.disk.put(key, fresh[key])
+                if self.disk is not None:
+                    self.disk.flush()
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return vectors[0] if single else np.stack(vectors)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk.slots) if self.disk is not None else 0
+        }
@@ -1,9 +1,13 @@
 import json
 import csv
-import requests
 from tqdm import tqdm
-from chromadb import PersistentClient
-from sentence_transformers import SentenceTransformer
+from retrieval import expand_neighbours
+from benchmark_retrieval import resolve_expected_hrefs
+from embedding_cache import DISK_DIR
+from resources import lazy_embedder, lazy_collection
+from llm_client import OllamaClient, LLMError
+from pipeline import Pipeline
+from tracing import PromptLogger
 
 # Konfigurasi
 PERSIST_DIR = './embeddings'
@@ -11,15 +15,15 @@ COLLECTION_NAME = 'penyakit_embeddings'
 TOP_K = 5
 QUESTIONS_FILE = 'Data/generated-questions.json'
 OUTPUT_CSV = 'Data/evaluated-qa.csv'
-OLLAMA_URL = 'http://localhost:11434/api/generate'
-MODEL_NAME = 'llama3.2:3b'
-TIMEOUT_SEC = 10
 MAX_QUESTIONS = 25  # Bisa diubah sesuai kebutuhan
+GENERATE_WORKERS = 2  # Panggilan LLM paralel; sesuaikan dengan OLLAMA_NUM_PARALLEL di server
 
 # Inisialisasi
-client = PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(name=COLLECTION_NAME)
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+collection = lazy_collection(PERSIST_DIR, COLLECTION_NAME)
+# Tier disk dipakai agar evaluasi ulang tidak meng-encode pertanyaan yang sama lagi
+embedder = lazy_embedder(disk_dir=DISK_DIR)
+llm = OllamaClient(pool_size=GENERATE_WORKERS)
+prompt_logger = PromptLogger()
 
 def query_context(question, top_k=TOP_K, window=2):
     embedding = embedder.encode(question).tolist()
@@ -32,38 +36,17 @@ def query_context(question, top_k=TOP_K, window=2):
     if not all_docs:
         return []
 
-    # Ambil window sebelum dan sesudah setiap dokumen utama
+    # Hit utama harus punya teks yang cukup dan indeks chunk (wajib ada di index)
+    hits = [
+        meta for doc, meta in zip(all_docs, all_metas)
+        if doc and len(doc.strip()) >= 50 and meta.get('chunk_index') is not None
+    ]
+
+    # Ambil window sebelum dan sesudah setiap dokumen utama dalam satu panggilan
     unique_chunks = {}
-    for i, (doc, meta) in enumerate(zip(all_docs, all_metas)):
-        if not doc or len(doc.strip()) < 50:
-            continue
-
-        # Ambil indeks dari metadata (wajib ada di index)
-        idx = meta.get('chunk_index')
-        if idx is None:
-            continue
-
-        href = meta.get('href', 'unknown')
-        name = meta.get('name', 'unknown')
-
-        # Ambil semua chunk di dokumen yang sama
-        related = collection.get(where={"href": href})
-        all_related_docs = related['documents']
-        all_related_metas = related['metadatas']
-
-        for offset in range(-window, window + 1):
-            j = idx + offset
-            if 0 <= j < len(all_related_docs):
-                text = all_related_docs[j]
-                submeta = all_related_metas[j]
-                if text and len(text.strip()) >= 50:
-                    key = (submeta['href'], submeta['chunk_index'])
-                    if key not in unique_chunks:
-                        unique_chunks[key] = {
-                            "name": submeta.get("name", name),
-                            "href": submeta.get("href", href),
-                            "text": text.strip()
-                        }
+    for chunk in expand_neighbours(collection, hits, window):
+        if len(chunk['text']) >= 50:
+            unique_chunks[(chunk['href'], chunk['chunk_index'])] = chunk
 
     # Hanya ambil maksimal TOP_K dokumen terbaik berdasarkan urutan awal
     combined = list(unique_chunks.values())
@@ -86,24 +69,12 @@ def query_context(question, top_k=TOP_K, window=2):
     return final_docs
 
 def ask_llama(prompt):
+    # Error dari Ollama dicatat di CSV sebagai jawaban kosong, bukan teks error yang mirip jawaban
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False
-        }, timeout=TIMEOUT_SEC)
-
-        if response.status_code == 200:
-            resp_text = response.json().get("response", "").strip()
-            if not resp_text:
-                return "⚠️ Model tidak memberikan respons."
-            return resp_text
-        else:
-            return f"⚠️ Error {response.status_code}: {response.text}"
-    except requests.exceptions.Timeout:
-        return "⚠️ Request ke Ollama API timeout."
-    except Exception as e:
-        return f"⚠️ Terjadi error saat memanggil Ollama API: {str(e)}"
+        return llm.generate(prompt)
+    except LLMError as e:
+        print(f"⚠️ Gagal memanggil Ollama API: {e}")
+        return ""
 
 def build_prompt(context_docs, question):
     context_lines = []
@@ -131,9 +102,8 @@ Jawaban:
 """.strip()
 
     # Simpan ke file log debug
-    with open('log_prompt_debug.txt', 'a', encoding='utf-8') as debug_log:
-        debug_log.write(f"\n--- Prompt untuk Pertanyaan: {question} ---\n")
-        debug_log.write(prompt + '\n')
+    # Sampel prompt untuk debug, ukuran file dibatasi (lihat tracing.py)
+    prompt_logger.log(question, prompt)
 
     return prompt
 
@@ -142,50 +112,77 @@ def evaluate_and_export_csv(questions, output_file):
     results = []
     reciprocal_ranks = []
 
-    print("\n🔍 Evaluasi Manual MRR ke CSV\n")
+    print("\n🔍 Evaluasi MRR ke CSV\n")
+    expected_hrefs = resolve_expected_hrefs(questions)
 
     with open(output_file, 'w', encoding='utf-8', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['question', 'answer', 'docs', 'rank', 'RR'])
 
+        indexes = []
         for i, item in enumerate(questions[:MAX_QUESTIONS]):
-            question = item.get('question', '').strip()
-            if not question:
+            if item.get('question', '').strip():
+                indexes.append(i)
+            else:
                 print(f"⚠️ Item ke-{i+1} tidak memiliki pertanyaan valid, dilewati.")
-                continue
 
+        # Retrieval pertanyaan berikutnya berjalan selagi LLM masih menjawab pertanyaan sebelumnya
+        def retrieve(i):
+            question = questions[i]['question'].strip()
             sources = query_context(question)
-            prompt = build_prompt(sources, question)
-            answer = ask_llama(prompt)
-
-            print(f"\n{i+1}. ❓ Pertanyaan: {question}")
-            print(f"💬 Jawaban LLaMA:\n{answer}\n")
-            if sources:
-                for idx, source in enumerate(sources):
-                    print(f"📄 [{idx+1}] {source['name']} - {source['href']}")
-            else:
-                print("📄 Tidak ada konteks relevan yang ditemukan.")
-
-            while True:
-                try:
-                    rank_input = input(f"🏷️ Rank dokumen yang benar (1-{TOP_K}, atau 0 jika tidak relevan): ").strip()
-                    rank = int(rank_input)
-                    if 0 <= rank <= TOP_K:
-                        break
-                except ValueError:
-                    pass
-                print(f"⚠️ Masukkan angka antara 0 sampai {TOP_K}.")
-
-            rr = 1.0 / rank if rank > 0 else 0.0
-            reciprocal_ranks.append(rr)
-
-            docs_str = "; ".join([f"{d['name']} ({d['href']})" for d in sources]) if sources else "Tidak ada dokumen"
-            writer.writerow([question, answer, docs_str, rank, f"{rr:.4f}"])
+            return i, question, sources, build_prompt(sources, question)
+
+        def generate(job):
+            i, question, sources, prompt = job
+            return i, question, sources, ask_llama(prompt)
+
+        pipeline = Pipeline().add_stage("retrieve", retrieve).add_stage("generate", generate, workers=GENERATE_WORKERS)
+        finished = {}
+        order = iter(indexes)
+        next_i = next(order, None)
+
+        for result in pipeline.run(indexes):
+            finished[result[0]] = result
+            # Hasil dicetak dan ditulis sesuai urutan pertanyaan, walau selesai tidak berurutan
+            while next_i in finished:
+                i, question, sources, answer = finished.pop(next_i)
+                next_i = next(order, None)
+
+                print(f"\n{i+1}. ❓ Pertanyaan: {question}")
+                print(f"💬 Jawaban LLaMA:\n{answer}\n")
+                if sources:
+                    for idx, source in enumerate(sources):
+                        print(f"📄 [{idx+1}] {source['name']} - {source['href']}")
+                else:
+                    print("📄 Tidak ada konteks relevan yang ditemukan.")
+
+                # Rank otomatis jika href yang benar diketahui, selain itu tanya manual
+                hrefs = [source['href'] for source in sources]
+                if expected_hrefs[i]:
+                    rank = hrefs.index(expected_hrefs[i]) + 1 if expected_hrefs[i] in hrefs else 0
+                    print(f"🏷️ Rank dokumen yang benar ({expected_hrefs[i]}): {rank}")
+
+                while not expected_hrefs[i]:
+                    try:
+                        rank_input = input(f"🏷️ Rank dokumen yang benar (1-{TOP_K}, atau 0 jika tidak relevan): ").strip()
+                        rank = int(rank_input)
+                        if 0 <= rank <= TOP_K:
+                            break
+                    except ValueError:
+                        pass
+                    print(f"⚠️ Masukkan angka antara 0 sampai {TOP_K}.")
+
+                rr = 1.0 / rank if rank > 0 else 0.0
+                reciprocal_ranks.append(rr)
+
+                docs_str = "; ".join([f"{d['name']} ({d['href']})" for d in sources]) if sources else "Tidak ada dokumen"
+                writer.writerow([question, answer, docs_str, rank, f"{rr:.4f}"])
 
         mrr = sum(reciprocal_ranks) / len(reciprocal_ranks) if reciprocal_ranks else 0.0
         writer.writerow([])
         writer.writerow(["", "", "", "MRR", f"{mrr:.4f}"])
 
+    pipeline.report()
     print(f"\n📁 CSV selesai disimpan ke: {output_file}")
     print(f"📊 Nilai MRR rata-rata: {mrr:.4f}")
 
@@ -1,24 +1,29 @@
+import os
 import json
 import csv
-import requests
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+from retrieval import expand_neighbours, expand_neighbours_batch
+from embedding_cache import DISK_DIR
+from resources import lazy_embedder, lazy_collection
+from llm_client import OllamaClient, LLMError
+from pipeline import Pipeline
 from sklearn.metrics import precision_score, recall_score, f1_score
 
 # Konfigurasi
 PERSIST_DIR = './embeddings'
 COLLECTION_NAME = 'penyakit_embeddings'
-OLLAMA_URL = 'http://localhost:11434/api/generate'
-MODEL_NAME = 'llama3.2:3b'
 TOP_K = 5
 WINDOW = 2
-TIMEOUT_SEC = 15
+QUESTIONS_FILE = "Data/questions_f1_eval.json"
 OUTPUT_CSV = "Data/evaluasi_f1.csv"
+CHECKPOINT_FILE = "Data/evaluasi_f1.checkpoint.jsonl"
+QUERY_BATCH_SIZE = 32  # Jumlah pertanyaan per encode + collection.query; kecil agar LLM cepat mulai bekerja
+MAX_CONCURRENCY = 4  # Panggilan LLM paralel; sesuaikan dengan OLLAMA_NUM_PARALLEL di server
 
 # Inisialisasi
-client = PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(name=COLLECTION_NAME)
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+collection = lazy_collection(PERSIST_DIR, COLLECTION_NAME)
+# Tier disk dipakai agar evaluasi ulang tidak meng-encode pertanyaan yang sama lagi
+embedder = lazy_embedder(disk_dir=DISK_DIR)
+llm = OllamaClient(pool_size=MAX_CONCURRENCY)
 
 def query_context(question, top_k=TOP_K, window=WINDOW):
     embedding = embedder.encode(question).tolist()
@@ -27,25 +32,13 @@ def query_context(question, top_k=TOP_K, window=WINDOW):
     if not results['documents'] or not results['metadatas']:
         return []
 
-    unique_chunks = {}
-    for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-        idx = meta.get('chunk_index')
-        href = meta.get('href')
-        name = meta.get('name')
-        related = collection.get(where={"href": href})
-        docs = related['documents']
-        metas = related['metadatas']
-        for offset in range(-window, window + 1):
-            j = idx + offset
-            if 0 <= j < len(docs):
-                key = (href, metas[j]['chunk_index'])
-                if key not in unique_chunks:
-                    unique_chunks[key] = {
-                        "name": name,
-                        "href": href,
-                        "text": docs[j].strip()
-                    }
-    return list(unique_chunks.values())
+    return expand_neighbours(collection, results['metadatas'][0], window)
+
+def query_context_batch(questions, top_k=TOP_K, window=WINDOW):
+    # Satu encode dan satu collection.query untuk seluruh batch pertanyaan
+    embeddings = embedder.encode(questions).tolist()
+    results = collection.query(query_embeddings=embeddings, n_results=top_k, include=['metadatas'])
+    return expand_neighbours_batch(collection, results['metadatas'], window)
 
 def build_prompt_with_context(question, context_docs):
     context_block = ""
@@ -74,17 +67,9 @@ Jawaban:
 
 def ask_llama(prompt):
     try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False
-        }, timeout=TIMEOUT_SEC)
-
-        if response.status_code == 200:
-            return response.json().get("response", "").strip()
-        else:
-            return ""
-    except Exception:
+        return llm.generate(prompt)
+    except LLMError as e:
+        print(f"⚠️ Gagal memanggil Ollama API: {e}")
         return ""
 
 def is_relevant(answer):
@@ -95,10 +80,57 @@ def is_relevant(answer):
         return 0
     return 0  # fallback
 
+def load_checkpoint(questions):
+    # Jawaban yang sudah ada di checkpoint tidak ditanyakan ulang ke LLM
+    answers = {}
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Baris terakhir bisa terpotong jika proses sebelumnya berhenti mendadak
+                i = record.get("index")
+                if isinstance(i, int) and i < len(questions) and questions[i] == record.get("question"):
+                    answers[i] = record["answer"]
+    return answers
+
 def main():
-    with open("Data/questions_f1_eval.json", "r", encoding="utf-8") as f:
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    questions = [entry["question"] for entry in data]
+    answers = load_checkpoint(questions)
+    pending = [i for i in range(len(questions)) if i not in answers]
+    if answers:
+        print(f"♻️ Melanjutkan dari checkpoint: {len(answers)} pertanyaan sudah dijawab, {len(pending)} tersisa")
+
+    # Stage retrieve (batch encode + query + prompt) mengisi antrean selagi stage generate menunggu Ollama
+    def retrieve(batch):
+        contexts = query_context_batch([questions[i] for i in batch])
+        return [(i, build_prompt_with_context(questions[i], context)) for i, context in zip(batch, contexts)]
+
+    def generate(job):
+        i, prompt = job
+        return i, ask_llama(prompt)
+
+    batches = [pending[start:start + QUERY_BATCH_SIZE] for start in range(0, len(pending), QUERY_BATCH_SIZE)]
+    pipeline = Pipeline(queue_size=QUERY_BATCH_SIZE) \
+        .add_stage("retrieve", retrieve, flatten=True) \
+        .add_stage("generate", generate, workers=MAX_CONCURRENCY)
+
+    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as checkpoint:
+        for i, answer in pipeline.run(batches):
+            answers[i] = answer
+            print(f"\n❓ Pertanyaan: {questions[i]}")
+            print(f"🤖 Jawaban (klasifikasi): {answers[i]}\n")
+            # Jawaban kosong (gagal menghubungi LLM) tidak di-checkpoint agar dicoba lagi saat resume
+            if answers[i]:
+                checkpoint.write(json.dumps({"index": i, "question": questions[i], "answer": answers[i]}, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+    pipeline.report()
+    failed = [i for i in range(len(questions)) if not answers.get(i)]
+
     y_true = []
     y_pred = []
 
@@ -106,21 +138,14 @@ def main():
         writer = csv.writer(csvfile)
         writer.writerow(["question", "label", "predicted", "llm_answer"])
 
-        for entry in data:
-            q = entry["question"]
+        for i, entry in enumerate(data):
             label = entry["label"]
             y_true.append(label)
 
-            context = query_context(q)
-            prompt = build_prompt_with_context(q, context)
-            print(f"\n❓ Pertanyaan: {q}")
-            answer = ask_llama(prompt)
-            print(f"🤖 Jawaban (klasifikasi): {answer}\n")
-
-            pred_label = is_relevant(answer)
+            pred_label = is_relevant(answers[i])
             y_pred.append(pred_label)
 
-            writer.writerow([q, label, pred_label, answer])
+            writer.writerow([entry["question"], label, pred_label, answers[i]])
 
     precision = precision_score(y_true, y_pred)
     recall = recall_score(y_true, y_pred)
@@ -131,5 +156,14 @@ def main():
     print(f"Recall:    {recall:.3f}")
     print(f"F1 Score:  {f1:.3f}")
 
+    if failed:
+        # Checkpoint dipertahankan: run berikutnya hanya mengulang pertanyaan yang gagal
+        print(f"\n⚠️ {len(failed)} pertanyaan gagal dijawab dan dihitung sebagai prediksi 0. "
+              f"Jalankan ulang untuk mencoba lagi (checkpoint: {CHECKPOINT_FILE})")
+        return
+
+    # Run selesai: checkpoint dihapus agar run berikutnya mulai dari awal
+    os.remove(CHECKPOINT_FILE)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,123 @@
+import os
+import re
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+
+# Konfigurasi
+HISTORY_DIR = 'history'
+DB_FILE = os.path.join(HISTORY_DIR, 'history.db')
+MAX_HISTORY = 3
+# 'full' = fsync setiap giliran; 'normal' = fsync saat checkpoint WAL (aman jika proses crash,
+# giliran terakhir bisa hilang jika listrik mati); 'off' = serahkan ke OS
+FSYNC = os.environ.get('HISTORY_FSYNC', 'normal')
+SYNC_MODES = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    session_id TEXT NOT NULL,
+    turn_no INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    PRIMARY KEY (session_id, turn_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS turns_ts ON turns (ts);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL
+);
+"""
+
+class HistoryStore:
+    # Satu baris per giliran; primary key (session_id, turn_no) membuat N giliran terakhir
+    # sebuah sesi cukup dibaca lewat satu range scan di B-tree, tanpa membaca sesi lain
+    def __init__(self, path=DB_FILE, fsync=FSYNC):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={SYNC_MODES[fsync]}")
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def new_session_id():
+        # Format mirip nama file lama: history_<timestamp>.json -> <timestamp>_<acak>
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    def append(self, session_id, question, answer, ts=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO turns (session_id, turn_no, ts, question, answer) "
+                "SELECT ?, COALESCE(MAX(turn_no), 0) + 1, ?, ?, ? FROM turns WHERE session_id = ?",
+                (session_id, ts or datetime.now().timestamp(), question, answer, session_id)
+            )
+
+    def recent(self, session_id, limit=MAX_HISTORY):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY turn_no DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        return [{"question": q, "answer": a} for q, a in reversed(rows)]
+
+    def iter_turns(self, since=None, until=None):
+        # Untuk analitik: scan berurutan waktu lewat index ts
+        query = "SELECT session_id, turn_no, ts, question, answer FROM turns WHERE ts >= ? AND ts < ? ORDER BY ts"
+        with self.lock:
+            rows = self.conn.execute(query, (since or 0, until or float('inf'))).fetchall()
+        for session_id, turn_no, ts, question, answer in rows:
+            yield {"session_id": session_id, "turn_no": turn_no, "ts": ts, "question": question, "answer": answer}
+
+    def stats(self):
+        with self.lock:
+            sessions, turns = self.conn.execute("SELECT COUNT(DISTINCT session_id), COUNT(*) FROM turns").fetchone()
+        return {"sessions": sessions, "turns": turns}
+
+    def import_json_dir(self, history_dir=HISTORY_DIR):
+        # Pindahkan history/history_*.json lama; file yang sudah pernah diimpor dilewati
+        imported = 0
+        turns = 0
+        for name in sorted(os.listdir(history_dir)) if os.path.isdir(history_dir) else []:
+            match = re.fullmatch(r'history_(\d{8}_\d{6})(?:_(\w+))?\.json', name)
+            if not match:
+                continue
+            path = os.path.join(history_dir, name)
+            with self.lock:
+                if self.conn.execute("SELECT 1 FROM imported_files WHERE path = ?", (path,)).fetchone():
+                    continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ {path} dilewati: {e}")
+                continue
+
+            session_id = match.group(1) + (f"_{match.group(2)}" if match.group(2) else "")
+            # Waktu tiap giliran tidak tercatat di file lama: pakai waktu file + nomor giliran
+            start = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO turns (session_id, turn_no, ts, question, answer) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (session_id, n, start + n, turn.get('question', ''), turn.get('answer', ''))
+                        for n, turn in enumerate(history, 1)
+                    ]
+                )
+                self.conn.execute("INSERT INTO imported_files (path, session_id) VALUES (?, ?)", (path, session_id))
+            imported += 1
+            turns += len(history)
+        return imported, turns
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+if __name__ == "__main__":
+    store = HistoryStore()
+    files, turns = store.import_json_dir()
+    stats = store.stats()
+    print(f"✅ Impor {files} file ({turns} giliran) ke {DB_FILE}")
+    print(f"📊 Total: {stats['sessions']} sesi, {stats['turns']} giliran")
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+from jsonstream import iter_json_records, tee_records
+from preprocess import preprocess_entry
+from chunking import NUM_WORKERS as CHUNK_WORKERS, chunk_records
+from embedding import PERSIST_DIR, COLLECTION_NAME, iter_chunks, ingest_chunks
+
+# Konfigurasi
+RAW_FILE = 'Data/penyakit-data-raw.jsonl'  # .jsonl dari scrape-data.js, atau .json (array) versi lama
+PROCESSED_FILE = 'Data/penyakit-data-processed.json'
+CHUNKED_FILE = 'Data/penyakit-data-chunked.json'
+WRITE_INTERMEDIATE = os.environ.get('INGEST_WRITE_INTERMEDIATE', '0') == '1'  # 1 = tulis juga file processed/chunked
+
+class StageMeter:
+    # Hanya waktu di dalam stage ini yang dihitung, bukan waktu menunggu stage sebelumnya
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+
+    def source(self, records):
+        iterator = iter(records)
+        while True:
+            start = time.perf_counter()
+            record = next(iterator, None)
+            self.seconds += time.perf_counter() - start
+            if record is None:
+                return
+            self.items += 1
+            yield record
+
+    def map(self, records, func):
+        for record in records:
+            start = time.perf_counter()
+            result = func(record)
+            self.seconds += time.perf_counter() - start
+            self.items += 1
+            yield result
+
+def run_pipeline(raw_file=RAW_FILE, write_intermediate=WRITE_INTERMEDIATE, collection=None, chunk_workers=CHUNK_WORKERS):
+    # raw -> preprocess -> chunk -> embed -> Chroma sebagai satu rantai generator:
+    # setiap artikel mengalir sampai ke batch embedding tanpa file perantara
+    if collection is None:
+        from chromadb import PersistentClient
+        collection = PersistentClient(path=PERSIST_DIR).get_or_create_collection(name=COLLECTION_NAME)
+
+    read = StageMeter("read")
+    preprocess = StageMeter("preprocess")
+    chunk = StageMeter("chunk")
+
+    records = read.source(iter_json_records(raw_file))
+    records = preprocess.map(records, preprocess_entry)
+    if write_intermediate:
+        records = tee_records(records, PROCESSED_FILE)
+    # chunk_records bisa memakai process pool, jadi yang diukur adalah waktu menunggu hasilnya;
+    # waktu read/preprocess yang terjadi di dalam penantian itu dikurangkan saat laporan
+    records = chunk.source(chunk_records(records, chunk_workers))
+    if write_intermediate:
+        records = tee_records(records, CHUNKED_FILE)
+
+    start = time.perf_counter()
+    stats = ingest_chunks(collection, iter_chunks(records), desc="🔄 Ingest raw -> ChromaDB")
+    elapsed = time.perf_counter() - start
+
+    # Waktu stage embed = total dikurangi waktu menunggu stage chunk (yang sudah mencakup read/preprocess);
+    # penulisan file chunked, jika aktif, ikut terhitung di sini
+    upstream = chunk.seconds
+    report = [
+        (read.name, read.items, "artikel", read.seconds),
+        (preprocess.name, preprocess.items, "artikel", preprocess.seconds),
+        (chunk.name, chunk.items, "artikel", max(chunk.seconds - read.seconds - preprocess.seconds, 1e-9)),
+        ("embed+write", stats["chunks"], "chunk", max(elapsed - upstream, 1e-9))
+    ]
+
+    print(f"\n✅ {stats['chunks']} chunk dari {read.items} artikel masuk ke ChromaDB dalam {elapsed:.1f} detik")
+    if write_intermediate:
+        print(f"📁 File perantara: {PROCESSED_FILE}, {CHUNKED_FILE}")
+    print(f"\n{'stage':<12} {'item':>8} {'satuan':<8} {'detik':>8} {'item/detik':>12}")
+    for name, items, unit, seconds in report:
+        print(f"{name:<12} {items:>8} {unit:<8} {seconds:>8.2f} {items / seconds if seconds else 0:>12.1f}")
+    return {name: {"items": items, "seconds": seconds} for name, items, _, seconds in report}
+
+if __name__ == "__main__":
+    run_pipeline(sys.argv[1] if len(sys.argv) > 1 else RAW_FILE)
@@ -0,0 +1,71 @@
+import os
+import json
+
+# Konfigurasi
+READ_BLOCK = 1 << 16  # Karakter per pembacaan file JSON array
+
+def iter_json_records(path):
+    # Hasilkan record satu per satu tanpa json.load seluruh file.
+    # .jsonl: satu record per baris; selain itu: JSON array, di-decode bertahap dengan raw_decode
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = f.read(READ_BLOCK).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} bukan JSON array")
+        buffer = buffer[1:]
+        eof = False
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                if not buffer:
+                    raise json.JSONDecodeError("buffer kosong", buffer, 0)
+                record, end = decoder.raw_decode(buffer)
+                # Angka yang terpotong di batas blok tetap ter-decode ("12" dari "123", "4" dari "4.5"),
+                # jadi record baru dianggap lengkap jika sudah terlihat pemisah sesudahnya
+                rest = buffer[end:].lstrip()
+                if not rest or rest[0] not in ',]':
+                    raise json.JSONDecodeError("record belum diikuti ',' atau ']'", buffer, end)
+            except json.JSONDecodeError:
+                # Record terpotong di batas blok: baca blok berikutnya lalu coba lagi
+                if eof:
+                    raise
+                block = f.read(READ_BLOCK)
+                eof = not block
+                buffer += block
+                continue
+            yield record
+            buffer = buffer[end:]
+
+def tee_records(records, path):
+    # Teruskan record ke stage berikutnya sambil menulisnya ke file (JSONL atau JSON array).
+    # Ditulis ke .tmp dulu, baru di-rename setelah semua record lewat
+    tmp_path = path + '.tmp'
+    jsonl = path.endswith('.jsonl')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if not jsonl:
+            f.write('[')
+        for n, record in enumerate(records):
+            if jsonl:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                f.write(('\n' if n == 0 else ',\n') + json.dumps(record, ensure_ascii=False, indent=2))
+            yield record
+        if not jsonl:
+            f.write('\n]\n')
+    os.replace(tmp_path, path)
+
+def write_records(records, path):
+    count = 0
+    for _ in tee_records(records, path):
+        count += 1
+    return count
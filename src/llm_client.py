@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from stats_util import percentiles
+from tracing import tracer
+
+# Konfigurasi
+OLLAMA_HOSTS = os.environ.get('OLLAMA_HOSTS', 'http://localhost:11434').split(',')  # Pisahkan dengan koma untuk load balancing
+MODEL_NAME = 'llama3.2:3b'
+CONNECT_TIMEOUT_SEC = 5
+READ_TIMEOUT_SEC = 60  # Mode stream: batas jeda antar token; non-stream: batas seluruh jawaban
+MAX_RETRIES = 3
+BACKOFF_SEC = 1.0  # Jeda retry ke-n = BACKOFF_SEC x 2^n
+POOL_SIZE = 16  # Koneksi keep-alive per host
+METRICS_WINDOW = 1000  # Jumlah panggilan terakhir yang disimpan untuk statistik
+
+class LLMError(Exception):
+    def __init__(self, message, endpoint=None):
+        super().__init__(message)
+        self.endpoint = endpoint
+
+class LLMTimeoutError(LLMError):
+    pass
+
+class LLMHTTPError(LLMError):
+    def __init__(self, status, body, endpoint=None):
+        super().__init__(f"HTTP {status}: {body}", endpoint)
+        self.status = status
+        self.body = body
+
+class OllamaClient:
+    # Satu requests.Session (thread-safe untuk POST) dipakai bersama semua thread dan semua host
+    def __init__(self, hosts=OLLAMA_HOSTS, model=MODEL_NAME, connect_timeout=CONNECT_TIMEOUT_SEC,
+                 read_timeout=READ_TIMEOUT_SEC, max_retries=MAX_RETRIES, backoff_sec=BACKOFF_SEC, pool_size=POOL_SIZE):
+        self.hosts = [host.strip().rstrip('/') for host in hosts if host.strip()]
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.hosts), pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.metrics = deque(maxlen=METRICS_WINDOW)
+        self.errors = 0
+
+    def next_endpoint(self):
+        # Round-robin; retry otomatis jatuh ke host berikutnya
+        with self.lock:
+            host = self.hosts[self.counter % len(self.hosts)]
+            self.counter += 1
+        return host
+
+    def _post(self, path, payload, stream=False):
+        # Retry hanya sebelum respons diterima: timeout, koneksi gagal, atau HTTP 5xx
+        for attempt in range(self.max_retries + 1):
+            host = self.next_endpoint()
+            try:
+                response = self.session.post(host + path, json=payload, stream=stream, timeout=self.timeout)
+            except requests.exceptions.Timeout as e:
+                error = LLMTimeoutError(f"Timeout ke {host}: {e}", host)
+            except requests.exceptions.RequestException as e:
+                error = LLMError(f"Gagal menghubungi {host}: {e}", host)
+            else:
+                if response.status_code < 400:
+                    return host, response
+                error = LLMHTTPError(response.status_code, response.text[:500], host)
+                response.close()
+                # Error 4xx tidak akan berubah jika diulang
+                if response.status_code < 500:
+                    break
+
+            if attempt < self.max_retries:
+                time.sleep(self.backoff_sec * 2 ** attempt)
+
+        self.count_error()
+        raise error
+
+    def count_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def record(self, endpoint, kind, start, ttft, final):
+        # Field durasi Ollama dalam nanodetik
+        metric = {
+            "endpoint": endpoint,
+            "kind": kind,
+            "latency_sec": time.perf_counter() - start,
+            "ttft_sec": ttft,
+            "prompt_eval_count": final.get("prompt_eval_count", 0),
+            "eval_count": final.get("eval_count", 0),
+            "prompt_eval_ms": final.get("prompt_eval_duration", 0) / 1e6,
+            "eval_ms": final.get("eval_duration", 0) / 1e6,
+            "load_ms": final.get("load_duration", 0) / 1e6
+        }
+        with self.lock:
+            self.metrics.append(metric)
+        tracer.record_llm(metric)
+        return metric
+
+    def _stream(self, path, payload, kind, extract):
+        start = time.perf_counter()
+        host, response = self._post(path, {**payload, "stream": True}, stream=True)
+        ttft = None
+        try:
+            with response:
+                # Ollama mengirim NDJSON: satu objek JSON per baris, diakhiri "done": true
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        self.count_error()
+                        raise LLMError(f"Error dari model: {chunk['error']}", host)
+                    token = extract(chunk)
+                    if token:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        yield token
+                    if chunk.get("done"):
+                        self.record(host, kind, start, ttft, chunk)
+                        return
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Timeout saat membaca stream dilaporkan requests sebagai ConnectionError
+            self.count_error()
+            raise LLMTimeoutError(f"Stream dari {host} terputus: {e}", host)
+        except requests.exceptions.RequestException as e:
+            # Mis. ChunkedEncodingError jika koneksi putus di tengah chunk
+            self.count_error()
+            raise LLMError(f"Stream dari {host} rusak: {e}", host)
+        except ValueError as e:
+            self.count_error()
+            raise LLMError(f"Baris stream dari {host} bukan JSON: {e}", host)
+        raise LLMError(f"Stream dari {host} berakhir tanpa 'done'", host)
+
+    def generate(self, prompt, **options):
+        start = time.perf_counter()
+        host, response = self._post('/api/generate', {"model": self.model, "prompt": prompt, "stream": False, **options})
+        try:
+            data = response.json()
+        except ValueError:
+            self.count_error()
+            raise LLMError(f"Respons dari {host} bukan JSON: {response.text[:200]}", host)
+        self.record(host, "generate", start, None, data)
+        return data.get("response", "").strip()
+
+    def generate_stream(self, prompt, **options):
+        return self._stream('/api/generate', {"model": self.model, "prompt": prompt, **options},
+                            "generate", lambda chunk: chunk.get("response"))
+
+    def chat_stream(self, messages, **options):
+        return self._stream('/api/chat', {"model": self.model, "messages": messages, **options},
+                            "chat", lambda chunk: chunk.get("message", {}).get("content"))
+
+    def last_metrics(self):
+        with self.lock:
+            return self.metrics[-1] if self.metrics else None
+
+    def stats(self):
+        with self.lock:
+            metrics = list(self.metrics)
+            errors = self.errors
+        if not metrics:
+            return {"calls": 0, "errors": errors}
+        eval_sec = sum(m["eval_ms"] for m in metrics) / 1000
+        return {
+            "calls": len(metrics),
+            "errors": errors,
+            "latency_sec": percentiles([m["latency_sec"] for m in metrics]),
+            "ttft_sec": percentiles([m["ttft_sec"] for m in metrics if m["ttft_sec"] is not None]),
+            "prompt_eval_tokens": sum(m["prompt_eval_count"] for m in metrics),
+            "eval_tokens": sum(m["eval_count"] for m in metrics),
+            "eval_tokens_per_sec": sum(m["eval_count"] for m in metrics) / eval_sec if eval_sec else 0.0,
+            "per_endpoint": {
+                host: sum(1 for m in metrics if m["endpoint"] == host) for host in self.hosts
+            }
+        }
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import random
+import subprocess
+import threading
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from benchmark_retrieval import QUESTIONS_FILE
+from stats_util import percentiles
+from history_store import DB_FILE
+
+# Konfigurasi
+RESULTS_FILE = 'Data/loadtest.jsonl'
+HISTORY_DIR = 'history'
+CONCURRENCY = int(os.environ.get('LOADTEST_CONCURRENCY', '8'))  # Maksimal sesi yang dilayani bersamaan
+ARRIVAL_RATE = float(os.environ.get('LOADTEST_RATE', '0'))  # Sesi baru per detik (Poisson); 0 = closed loop
+MAX_SESSIONS = int(os.environ.get('LOADTEST_SESSIONS', '100'))
+USE_MOCK = os.environ.get('LOADTEST_MOCK', '1') == '1'  # 0 = pakai Ollama asli dari OLLAMA_HOSTS
+MOCK_PORT = 11435
+BYPASS_EMBED_CACHE = True  # Pertanyaan berulang tetap di-encode, seperti pertanyaan baru dari pengguna
+SATURATION_LEVELS = [1, 2, 4, 8, 16, 32]
+SATURATION_STEP_SEC = 10
+SATURATION_MIN_GAIN = 1.1  # Concurrency berikutnya harus menaikkan throughput minimal 10%
+RETRIEVAL_SLO_MS = 500  # Batas p95 retrieval
+SEED = 0
+
+def start_mock():
+    # Proses terpisah agar thread mock tidak berebut GIL dengan retrieval yang sedang diukur
+    env = {**os.environ, 'MOCK_OLLAMA_PORT': str(MOCK_PORT)}
+    process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_ollama.py')],
+                               env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{MOCK_PORT}"
+    for _ in range(50):
+        try:
+            urllib.request.urlopen(url + '/api/tags', timeout=1).close()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock Ollama tidak bisa dijalankan")
+
+def load_sessions(history_store, questions_file=QUESTIONS_FILE, history_dir=HISTORY_DIR):
+    # Sesi = daftar pertanyaan yang diputar ulang berurutan; generated-questions masing-masing satu giliran
+    sessions = defaultdict(list)
+    # Tanpa history.db cukup pakai file JSON lama; jangan sampai load test membuat database kosong
+    if os.path.exists(DB_FILE):
+        for turn in history_store.iter_turns():
+            sessions[turn['session_id']].append(turn['question'])
+    if not sessions and os.path.isdir(history_dir):
+        for name in sorted(os.listdir(history_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(history_dir, name), 'r', encoding='utf-8') as f:
+                    sessions[name] = [turn.get('question', '') for turn in json.load(f)]
+    replay = [[q.strip() for q in questions if q.strip()] for questions in sessions.values()]
+
+    with open(questions_file, 'r', encoding='utf-8') as f:
+        replay += [[item['question'].strip()] for item in json.load(f) if item.get('question', '').strip()]
+
+    replay = [questions for questions in replay if questions]
+    random.Random(SEED).shuffle(replay)
+    return replay[:MAX_SESSIONS]
+
+def embed(chatbot, question, recent_history):
+    if not BYPASS_EMBED_CACHE:
+        return chatbot.embed_query(question, recent_history)
+    with chatbot.tracer.span("encode"):
+        return chatbot.embedder.model.encode(chatbot.combine_query_text(question, recent_history)).tolist()
+
+def run_turn(chatbot, question, recent_history, ready):
+    # ready = saat giliran ini seharusnya mulai; selisih dengan start = waktu antre di pool
+    start = time.perf_counter()
+    context = chatbot.query_context_with_history(question, recent_history, embedding=embed(chatbot, question, recent_history))
+    retrieval_end = time.perf_counter()
+    prompt = chatbot.build_prompt(context, question, recent_history)
+
+    ttft = None
+    parts = []
+    if not prompt.startswith("Maaf, saya tidak memiliki informasi"):
+        for token in chatbot.llm.generate_stream(prompt):
+            if ttft is None:
+                ttft = time.perf_counter() - ready
+            parts.append(token)
+    end = time.perf_counter()
+    return {
+        "queue_ms": (start - ready) * 1000,
+        "retrieval_ms": (retrieval_end - start) * 1000,
+        "ttft_ms": ttft * 1000 if ttft is not None else None,
+        "e2e_ms": (end - ready) * 1000,
+        "answer": "".join(parts).strip() or prompt
+    }
+
+def run_session(chatbot, questions, arrival, results, lock):
+    history = []
+    ready = arrival or time.perf_counter()
+    for question in questions:
+        try:
+            result = run_turn(chatbot, question, history[-chatbot.MAX_HISTORY:], ready)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        with lock:
+            results.append(result)
+        if "error" in result:
+            return
+        history.append({"question": question, "answer": result.pop("answer")})
+        ready = time.perf_counter()
+
+def replay(chatbot, sessions, concurrency=CONCURRENCY, rate=ARRIVAL_RATE):
+    # Open loop (rate > 0): sesi datang sesuai jadwal Poisson walau server lambat, sehingga
+    # waktu antre ikut terukur; closed loop: setiap worker langsung mengambil sesi berikutnya
+    results = []
+    lock = threading.Lock()
+    rng = random.Random(SEED)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        arrival = start
+        for questions in sessions:
+            if rate > 0:
+                arrival += rng.expovariate(rate)
+                time.sleep(max(0.0, arrival - time.perf_counter()))
+            pool.submit(run_session, chatbot, questions, arrival if rate > 0 else None, results, lock)
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if "error" not in r]
+    errors = [r["error"] for r in results if "error" in r]
+    return {
+        "sessions": len(sessions),
+        "turns": len(ok),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": elapsed,
+        "turns_per_sec": len(ok) / elapsed if elapsed else 0.0,
+        "queue_ms": percentiles([r["queue_ms"] for r in ok]),
+        "retrieval_ms": percentiles([r["retrieval_ms"] for r in ok]),
+        "ttft_ms": percentiles([r["ttft_ms"] for r in ok if r["ttft_ms"] is not None]),
+        "e2e_ms": percentiles([r["e2e_ms"] for r in ok])
+    }
+
+def measure_retrieval(chatbot, questions, concurrency, seconds=SATURATION_STEP_SEC):
+    # Closed loop tanpa LLM: setiap thread mengulang encode + query_context secepat mungkin
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(offset):
+        rng = random.Random(SEED + offset)
+        while time.perf_counter() < deadline:
+            question = rng.choice(questions)
+            t0 = time.perf_counter()
+            chatbot.query_context_with_history(question, [], embedding=embed(chatbot, question, []))
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "queries": len(latencies), "qps": len(latencies) / elapsed,
+            "latency_ms": percentiles(latencies)}
+
+def find_saturation(chatbot, questions, levels=SATURATION_LEVELS, slo_ms=RETRIEVAL_SLO_MS):
+    # Naikkan concurrency sampai throughput berhenti naik atau p95 melewati SLO;
+    # titik jenuh = level terakhir yang masih memberi tambahan throughput dalam SLO
+    steps = []
+    best = None
+    for level in levels:
+        step = measure_retrieval(chatbot, questions, level)
+        steps.append(step)
+        print(f"  concurrency {level:>3}: {step['qps']:>7.1f} query/detik, "
+              f"p95 {step['latency_ms'].get('p95', 0):.0f} ms")
+        if step['latency_ms'].get('p95', 0) > slo_ms:
+            break
+        if best is not None and step['qps'] < best['qps'] * SATURATION_MIN_GAIN:
+            break
+        best = step
+    return {"steps": steps, "saturation": best, "slo_ms": slo_ms}
+
+def fmt(values):
+    return "  ".join(f"{p}={v:.0f}" for p, v in values.items()) if values else "-"
+
+def main(mode='all'):
+    mock = None
+    if USE_MOCK:
+        mock, url = start_mock()
+        # Harus di-set sebelum chatbot (dan llm_client) di-import
+        os.environ['OLLAMA_HOSTS'] = url
+        print(f"🧪 Mock Ollama di {url}")
+
+    try:
+        import chatbot
+        chatbot.embedder.load()
+        chatbot.collection.load()
+        sessions = load_sessions(chatbot.history_store)
+        report = {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "mock": USE_MOCK,
+            "concurrency": CONCURRENCY,
+            "arrival_rate": ARRIVAL_RATE
+        }
+
+        if mode in ('all', 'replay'):
+            turns = sum(len(s) for s in sessions)
+            loop = f"{ARRIVAL_RATE} sesi/detik" if ARRIVAL_RATE > 0 else "closed loop"
+            print(f"\n🚦 Replay {len(sessions)} sesi ({turns} giliran), concurrency {CONCURRENCY}, {loop}")
+            report["replay"] = replay(chatbot, sessions)
+            r = report["replay"]
+            print(f"  {r['turns']} giliran dalam {r['seconds']:.1f} detik = {r['turns_per_sec']:.2f} giliran/detik, "
+                  f"{r['errors']} error")
+            for key in ('queue_ms', 'retrieval_ms', 'ttft_ms', 'e2e_ms'):
+                print(f"  {key:<13} {fmt(r[key])}")
+            # Rincian per tahap dari tracer (encode, query, rerank, generate, ...)
+            report["stages"] = chatbot.tracer.stats()
+
+        if mode in ('all', 'saturate'):
+            questions = [q for session in sessions for q in session]
+            print(f"\n📈 Mencari titik jenuh retrieval (SLO p95 {RETRIEVAL_SLO_MS} ms, "
+                  f"{SATURATION_STEP_SEC} detik per level)")
+            report["retrieval_saturation"] = find_saturation(chatbot, questions)
+            best = report["retrieval_saturation"]["saturation"]
+            if best:
+                print(f"  Titik jenuh: concurrency {best['concurrency']}, {best['qps']:.1f} query/detik")
+            else:
+                print("  Concurrency 1 pun sudah melewati SLO")
+    finally:
+        if mock is not None:
+            mock.terminate()
+            try:
+                mock.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                mock.kill()
+                mock.wait()
+
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    print(f"\n📁 Hasil ditambahkan ke: {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else 'all')
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Konfigurasi
+HOST = os.environ.get('MOCK_OLLAMA_HOST', '127.0.0.1')
+PORT = int(os.environ.get('MOCK_OLLAMA_PORT', '11435'))
+TOKEN_LATENCY_MS = float(os.environ.get('MOCK_TOKEN_LATENCY_MS', '20'))  # Jeda antar token jawaban (~50 token/detik)
+PROMPT_EVAL_MS_PER_TOKEN = float(os.environ.get('MOCK_PROMPT_EVAL_MS_PER_TOKEN', '0.5'))  # Waktu sebelum token pertama
+ANSWER_TOKENS = int(os.environ.get('MOCK_ANSWER_TOKENS', '64'))
+NUM_PARALLEL = int(os.environ.get('MOCK_NUM_PARALLEL', '4'))  # Seperti OLLAMA_NUM_PARALLEL: request lain mengantre
+CHARS_PER_TOKEN = 4
+
+WORDS = "Demam berdarah disebabkan virus dengue yang ditularkan nyamuk Aedes aegypti dan perlu penanganan dokter".split()
+
+class MockOllama:
+    # Meniru /api/generate dan /api/chat Ollama: NDJSON per token, lalu objek "done" dengan metrik durasi
+    def __init__(self, token_latency_ms=TOKEN_LATENCY_MS, prompt_eval_ms_per_token=PROMPT_EVAL_MS_PER_TOKEN,
+                 answer_tokens=ANSWER_TOKENS, num_parallel=NUM_PARALLEL):
+        self.token_latency_ms = token_latency_ms
+        self.prompt_eval_ms_per_token = prompt_eval_ms_per_token
+        self.answer_tokens = answer_tokens
+        self.slots = threading.Semaphore(num_parallel)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def prompt_tokens(self, payload):
+        if "messages" in payload:
+            text = "".join(m.get("content", "") for m in payload["messages"])
+        else:
+            text = payload.get("prompt", "")
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    def generate(self, payload):
+        # Hasilkan (teks token, objek chunk) satu per satu; waktu antre slot tidak dihitung sebagai load_duration
+        chat = "messages" in payload
+        with self.lock:
+            self.requests += 1
+        start = time.perf_counter()
+        with self.slots:
+            load_ns = int((time.perf_counter() - start) * 1e9)
+            prompt_tokens = self.prompt_tokens(payload)
+            prompt_eval_sec = prompt_tokens * self.prompt_eval_ms_per_token / 1000
+            time.sleep(prompt_eval_sec)
+
+            eval_start = time.perf_counter()
+            for i in range(self.answer_tokens):
+                time.sleep(self.token_latency_ms / 1000)
+                token = ("" if i == 0 else " ") + WORDS[i % len(WORDS)]
+                yield token, {"message": {"role": "assistant", "content": token}} if chat else {"response": token}
+
+            final = {
+                "done": True,
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": load_ns,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_eval_sec * 1e9),
+                "eval_count": self.answer_tokens,
+                "eval_duration": int((time.perf_counter() - eval_start) * 1e9)
+            }
+            yield None, {**final, "message": {"role": "assistant", "content": ""}} if chat else {**final, "response": ""}
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self.send_json(200, {"models": [{"name": "mock"}], "requests": mock.requests})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ('/api/generate', '/api/chat'):
+                self.send_json(404, {"error": "not found"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            except json.JSONDecodeError:
+                self.send_json(400, {"error": "invalid JSON"})
+                return
+            base = {"model": payload.get("model", "mock"), "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+            if not payload.get("stream", True):
+                parts = []
+                for token, chunk in mock.generate(payload):
+                    if token is not None:
+                        parts.append(token)
+                text = "".join(parts)
+                chunk.update({"message": {"role": "assistant", "content": text}} if "messages" in payload else {"response": text})
+                self.send_json(200, {**base, **chunk})
+                return
+
+            # Chunked transfer: satu baris NDJSON per token, seperti Ollama
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for _, chunk in mock.generate(payload):
+                    line = (json.dumps({**base, **chunk}) + "\n").encode('utf-8')
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Klien menutup koneksi keep-alive saat selesai: bukan error
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def start_server(host=HOST, port=PORT, **options):
+    mock = MockOllama(**options)
+    server = MockServer((host, port), make_handler(mock))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+if __name__ == "__main__":
+    server = start_server()
+    print(f"🧪 Mock Ollama di http://{HOST}:{PORT} ({TOKEN_LATENCY_MS:.0f} ms/token, "
+          f"{ANSWER_TOKENS} token/jawaban, {NUM_PARALLEL} slot paralel)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
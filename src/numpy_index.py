@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import numpy as np
+from quantization import RERANK_FACTORS, quantizer_exists, load_quantizer, build_quantizers, search, top_k
+
+# Konfigurasi
+PERSIST_DIR = './embeddings'
+COLLECTION_NAME = 'penyakit_embeddings'
+INDEX_DIR = './embeddings/numpy'
+DTYPE = 'float32'  # 'float16' = setengah memori, skor tetap dihitung dalam float32
+PAGE_SIZE = 1000
+BLOCK_SIZE = 65536  # Baris per blok saat menghitung skor dari matriks float16
+QUANTIZATION = os.environ.get('NUMPY_QUANTIZATION') or None  # None, 'int8' atau 'pq' (python src/quantization.py)
+
+def export_collection(collection, index_dir=INDEX_DIR, dtype=DTYPE):
+    # Salin isi collection ChromaDB ke matriks .npy + array metadata paralel
+    start = time.perf_counter()
+    total = collection.count()
+    os.makedirs(index_dir, exist_ok=True)
+
+    vectors = None
+    tmp_path = os.path.join(index_dir, 'vectors.npy.tmp')
+    data = {"ids": [], "documents": [], "names": [], "hrefs": [], "chunk_indexes": []}
+
+    for offset in range(0, total, PAGE_SIZE):
+        page = collection.get(limit=PAGE_SIZE, offset=offset, include=['embeddings', 'documents', 'metadatas'])
+        embeddings = np.asarray(page['embeddings'], dtype=np.float32)
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(total, embeddings.shape[1]))
+        vectors[offset:offset + len(embeddings)] = embeddings
+
+        for chunk_id, doc, meta in zip(page['ids'], page['documents'], page['metadatas']):
+            data["ids"].append(chunk_id)
+            data["documents"].append(doc)
+            data["names"].append(meta.get('name'))
+            data["hrefs"].append(meta.get('href'))
+            data["chunk_indexes"].append(meta.get('chunk_index'))
+
+    if vectors is None:
+        print("📭 Collection kosong, tidak ada yang diekspor.")
+        return
+    vectors.flush()
+
+    # Kode kuantisasi yang sudah ada dibangun ulang dari vektor baru (masih di .tmp) sebelum apa pun
+    # diganti, agar jeda antara kode baru dan vektor lama hanya sebatas dua os.replace
+    kinds = [kind for kind in ('int8', 'pq') if quantizer_exists(index_dir, kind)]
+    if kinds:
+        build_quantizers(vectors, index_dir, kinds)
+    del vectors
+    os.replace(tmp_path, os.path.join(index_dir, 'vectors.npy'))
+
+    # data.json ditulis terakhir, sehingga keberadaannya menandakan ekspor selesai
+    data_path = os.path.join(index_dir, 'data.json')
+    with open(data_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(data_path + '.tmp', data_path)
+
+    size_mb = os.path.getsize(os.path.join(index_dir, 'vectors.npy')) / 1e6
+    print(f"✅ Ekspor {total} vektor ({dtype}, {size_mb:.1f} MB) ke {index_dir} "
+          f"dalam {time.perf_counter() - start:.1f} detik")
+
+class NumpyCollection:
+    # Pengganti collection ChromaDB untuk query/get/count, dengan format hasil yang sama
+    def __init__(self, index_dir=INDEX_DIR, quantization=QUANTIZATION):
+        self.vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+        with open(os.path.join(index_dir, 'data.json'), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.ids = data["ids"]
+        self.documents = data["documents"]
+        self.metadatas = [
+            {"name": name, "href": href, "chunk_index": idx}
+            for name, href, idx in zip(data["names"], data["hrefs"], data["chunk_indexes"])
+        ]
+        self.positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        self.quantizer = load_quantizer(index_dir, quantization) if quantization else None
+        self.rerank_factor = RERANK_FACTORS.get(quantization)
+        # ||x||^2 disimpan agar jarak L2 (metrik default ChromaDB) cukup dihitung dari dot product.
+        # Dengan kuantisasi, matriks float hanya dibaca untuk baris shortlist sehingga tidak perlu resident
+        self.sq_norms = None if self.quantizer else self._blocks(lambda block: np.einsum('ij,ij->i', block, block))
+
+    @staticmethod
+    def exists(index_dir=INDEX_DIR):
+        return os.path.exists(os.path.join(index_dir, 'data.json'))
+
+    def _blocks(self, func):
+        if self.vectors.dtype == np.float32:
+            return func(self.vectors)
+        return np.concatenate([
+            func(np.asarray(self.vectors[i:i + BLOCK_SIZE], dtype=np.float32))
+            for i in range(0, len(self.vectors), BLOCK_SIZE)
+        ], axis=-1)
+
+    def count(self):
+        return len(self.ids)
+
+    def _rows(self, positions, include):
+        result = {"ids": [self.ids[i] for i in positions]}
+        if 'documents' in include:
+            result["documents"] = [self.documents[i] for i in positions]
+        if 'metadatas' in include:
+            result["metadatas"] = [self.metadatas[i] for i in positions]
+        if 'embeddings' in include:
+            result["embeddings"] = np.asarray(self.vectors[positions], dtype=np.float32)
+        return result
+
+    def query(self, query_embeddings, n_results=10, include=('documents', 'metadatas', 'distances')):
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        n_results = min(n_results, len(self.ids))
+
+        if self.quantizer is not None:
+            top = search(self.quantizer, self.vectors, queries, n_results, self.rerank_factor)
+            distances = None
+        else:
+            # Semua query dihitung sekaligus: (q x d) @ (d x n)
+            dots = self._blocks(lambda block: queries @ block.T)
+            distances = (queries * queries).sum(axis=1, keepdims=True) + self.sq_norms - 2 * dots
+            top = top_k(distances, n_results)
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row, positions in enumerate(top):
+            rows = self._rows(positions.tolist(), include)
+            results["ids"].append(rows["ids"])
+            results["documents"].append(rows.get("documents"))
+            results["metadatas"].append(rows.get("metadatas"))
+            if distances is None:
+                exact = np.asarray(self.vectors[positions], dtype=np.float32) - queries[row]
+                results["distances"].append((exact ** 2).sum(axis=1).tolist())
+            else:
+                results["distances"].append(distances[row, positions].tolist())
+        return results
+
+    def get(self, ids=None, limit=None, offset=0, include=('documents', 'metadatas')):
+        if ids is None:
+            positions = list(range(offset, len(self.ids) if limit is None else min(len(self.ids), offset + limit)))
+        else:
+            # Seperti ChromaDB: id yang tidak ada dilewati tanpa error
+            positions = [self.positions[chunk_id] for chunk_id in ids if chunk_id in self.positions]
+        return self._rows(positions, include)
+
+if __name__ == "__main__":
+    from chromadb import PersistentClient
+
+    client = PersistentClient(path=PERSIST_DIR)
+    export_collection(client.get_or_create_collection(name=COLLECTION_NAME))
@@ -0,0 +1,127 @@
+import time
+import queue
+import threading
+
+# Konfigurasi
+QUEUE_SIZE = 8  # Batas antrean antar stage; producer berhenti sementara jika consumer tertinggal
+
+_DONE = object()
+
+class _Failure:
+    # Exception dari sebuah stage diteruskan ke hilir lalu dilempar ulang di thread pemanggil
+    def __init__(self, error):
+        self.error = error
+
+class Stage:
+    def __init__(self, name, func, workers=1, flatten=False):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.flatten = flatten  # True: hasil func berupa iterable, setiap elemennya diteruskan terpisah
+        self.lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_sec = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    def observe(self, depth, busy_sec, produced):
+        with self.lock:
+            self.items_in += 1
+            self.items_out += produced
+            self.busy_sec += busy_sec
+            self.depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+
+class Pipeline:
+    # Setiap stage berjalan di thread sendiri, dihubungkan queue terbatas:
+    # stage N mengerjakan item berikutnya selagi stage N+1 masih memproses item sebelumnya
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages = []
+        self.wall_sec = 0.0
+
+    def add_stage(self, name, func, workers=1, flatten=False):
+        self.stages.append(Stage(name, func, workers, flatten))
+        return self
+
+    def _feed(self, items, out_queue, consumers):
+        try:
+            for item in items:
+                out_queue.put(item)
+        except Exception as e:
+            out_queue.put(_Failure(e))
+        for _ in range(consumers):
+            out_queue.put(_DONE)
+
+    def _work(self, stage, in_queue, out_queue, remaining, consumers):
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                out_queue.put(item)
+                continue
+
+            depth = in_queue.qsize()
+            start = time.perf_counter()
+            try:
+                results = list(stage.func(item)) if stage.flatten else [stage.func(item)]
+            except Exception as e:
+                results = [_Failure(e)]
+            stage.observe(depth, time.perf_counter() - start, len(results))
+            for result in results:
+                out_queue.put(result)
+
+        # Worker terakhir dari stage ini yang memberi tahu stage berikutnya bahwa input sudah habis
+        with remaining["lock"]:
+            remaining["count"] -= 1
+            last = remaining["count"] == 0
+        if last:
+            for _ in range(consumers):
+                out_queue.put(_DONE)
+
+    def run(self, items):
+        # Generator hasil stage terakhir, urutan sesuai selesai (bukan urutan input jika workers > 1)
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], self.stages[0].workers), daemon=True)]
+        for n, stage in enumerate(self.stages):
+            consumers = self.stages[n + 1].workers if n + 1 < len(self.stages) else 1
+            remaining = {"count": stage.workers, "lock": threading.Lock()}
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(stage, queues[n], queues[n + 1], remaining, consumers), daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self.wall_sec = time.perf_counter() - start
+
+    def stats(self):
+        wall = self.wall_sec or 1e-9
+        return [{
+            "stage": stage.name,
+            "workers": stage.workers,
+            "items": stage.items_in,
+            "items_per_sec": stage.items_out / wall,
+            "busy": stage.busy_sec / (wall * stage.workers),
+            "avg_queue": stage.depth_sum / stage.items_in if stage.items_in else 0.0,
+            "max_queue": stage.depth_max
+        } for stage in self.stages]
+
+    def report(self):
+        print(f"\n⏱️ Pipeline selesai dalam {self.wall_sec:.1f} detik")
+        print(f"{'stage':<10} {'worker':>6} {'item':>6} {'item/s':>8} {'sibuk':>6} {'antrean':>8} {'maks':>5}")
+        for s in self.stats():
+            print(f"{s['stage']:<10} {s['workers']:>6} {s['items']:>6} {s['items_per_sec']:>8.2f} "
+                  f"{s['busy']:>6.0%} {s['avg_queue']:>8.1f} {s['max_queue']:>5}")
@@ -1,36 +1,31 @@
-import json
+from jsonstream import iter_json_records, write_records
 
-INPUT_FILE = 'Data/penyakit-data-raw.json'
+INPUT_FILE = 'Data/penyakit-data-raw.jsonl'  # Output scrape-data.js (versi terbaru per artikel)
 OUTPUT_FILE = 'Data/penyakit-data-processed.json'
 
-def preprocess_data(input_path, output_path):
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    processed_data = []
+def preprocess_entry(entry):
+    name = entry["name"]
+    href = entry["href"]
+    paragraphs = entry["paragraphs"]
 
-    for entry in data:
-        name = entry["name"]
-        href = entry["href"]
-        paragraphs = entry["paragraphs"]
+    # Hapus paragraf terakhir (referensi)
+    if paragraphs:
+        paragraphs = paragraphs[:-1]
 
-        # Hapus paragraf terakhir (referensi)
-        if paragraphs:
-            paragraphs = paragraphs[:-1]
+    # Ganti ; dengan , di setiap paragraf
+    cleaned_paragraphs = [p.replace(';', ',').strip() for p in paragraphs if p.strip()]
 
-        # Ganti ; dengan , di setiap paragraf
-        cleaned_paragraphs = [p.replace(';', ',').strip() for p in paragraphs if p.strip()]
+    return {
+        "name": name,
+        "href": href,
+        "paragraphs": cleaned_paragraphs
+    }
 
-        processed_data.append({
-            "name": name,
-            "href": href,
-            "paragraphs": cleaned_paragraphs
-        })
-
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(processed_data, f, ensure_ascii=False, indent=2)
+def preprocess_data(input_path, output_path):
+    # Record dibaca dan ditulis satu per satu, memori tidak bergantung pada ukuran korpus
+    count = write_records((preprocess_entry(entry) for entry in iter_json_records(input_path)), output_path)
 
-    print(f"✅ Preprocessing selesai. Data disimpan di: {output_path}")
+    print(f"✅ Preprocessing selesai ({count} artikel). Data disimpan di: {output_path}")
 
 if __name__ == "__main__":
     preprocess_data(INPUT_FILE, OUTPUT_FILE)
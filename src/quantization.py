@@ -0,0 +1,219 @@
+import os
+import time
+import numpy as np
+
+# Konfigurasi
+BLOCK_SIZE = 65536  # Baris per blok saat men-decode kode ke float32
+PQ_SUBSPACES = 48  # 384 dimensi MiniLM / 48 = 8 dimensi per subspace
+PQ_CENTROIDS = 256  # Satu byte per subspace
+PQ_TRAIN_SIZE = 20000
+PQ_ITERATIONS = 15
+# Shortlist = top_k x faktor ini, lalu di-rerank dengan vektor float asli. int8 sudah recall ~1.0 di x4;
+# PQ (48 byte/vektor + codebook tetap ~0,4 MB, ~8,6x lebih kecil dari float32 pada ~3000 chunk) hanya
+# ~0,75 recall@5 di x4 dan ~0,93-0,95 di x16, jadi PQ memakai shortlist lebih panjang
+RERANK_FACTORS = {'int8': 4, 'pq': 16}
+
+def _blocks(n):
+    return range(0, n, BLOCK_SIZE)
+
+def _save_atomic(path, array=None, **arrays):
+    # Seperti bm25_index.save_atomic: file lama tetap utuh untuk reader yang me-mmap-nya sampai os.replace
+    with open(path + '.tmp', 'wb') as f:
+        if arrays:
+            np.savez(f, **arrays)
+        else:
+            np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+class ScalarQuantizer:
+    # int8 per dimensi: x ~ low + scale * (code + 128)
+    def __init__(self, low, scale, codes):
+        self.low = low
+        self.scale = scale
+        self.codes = codes
+        self.sq_norms = np.concatenate([
+            (self.decode(codes[i:i + BLOCK_SIZE]) ** 2).sum(axis=1) for i in _blocks(len(codes))
+        ]) if len(codes) else np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors):
+        low = np.full(vectors.shape[1], np.inf, dtype=np.float32)
+        high = np.full(vectors.shape[1], -np.inf, dtype=np.float32)
+        for i in _blocks(len(vectors)):
+            block = np.asarray(vectors[i:i + BLOCK_SIZE], dtype=np.float32)
+            low = np.minimum(low, block.min(axis=0))
+            high = np.maximum(high, block.max(axis=0))
+        scale = np.maximum(high - low, 1e-12) / 255
+
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for i in _blocks(len(vectors)):
+            block = np.asarray(vectors[i:i + BLOCK_SIZE], dtype=np.float32)
+            codes[i:i + BLOCK_SIZE] = (np.clip(np.rint((block - low) / scale), 0, 255) - 128).astype(np.int8)
+        return cls(low, scale, codes)
+
+    def decode(self, codes):
+        return self.low + self.scale * (codes.astype(np.float32) + 128)
+
+    def distances(self, queries):
+        # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, dengan q.x = q.low + (q * scale).(code + 128)
+        scaled = queries * self.scale
+        offset = queries @ self.low
+        dots = np.concatenate([
+            scaled @ (self.codes[i:i + BLOCK_SIZE].astype(np.float32) + 128).T for i in _blocks(len(self.codes))
+        ], axis=1) + offset[:, None]
+        return (queries ** 2).sum(axis=1, keepdims=True) + self.sq_norms - 2 * dots
+
+    def save(self, index_dir):
+        # Kode ditulis terakhir karena keberadaannya dipakai quantizer_exists
+        _save_atomic(os.path.join(index_dir, 'sq_params.npz'), low=self.low, scale=self.scale)
+        _save_atomic(os.path.join(index_dir, 'sq_codes.npy'), self.codes)
+
+    @classmethod
+    def load(cls, index_dir):
+        params = np.load(os.path.join(index_dir, 'sq_params.npz'))
+        return cls(params['low'], params['scale'], np.load(os.path.join(index_dir, 'sq_codes.npy'), mmap_mode='r'))
+
+    def nbytes(self):
+        return self.codes.nbytes + self.sq_norms.nbytes
+
+class ProductQuantizer:
+    # Vektor dibagi ke M subspace, tiap subspace diganti indeks centroid terdekat (uint8)
+    def __init__(self, centroids, codes):
+        self.centroids = centroids  # (M, 256, d/M)
+        self.codes = codes  # (n, M)
+
+    @classmethod
+    def fit(cls, vectors, subspaces=PQ_SUBSPACES, n_centroids=PQ_CENTROIDS, seed=0):
+        n, dim = vectors.shape
+        if dim % subspaces:
+            raise ValueError(f"Dimensi {dim} tidak habis dibagi {subspaces} subspace")
+        sub_dim = dim // subspaces
+        rng = np.random.default_rng(seed)
+        train = np.asarray(vectors[np.sort(rng.choice(n, min(n, PQ_TRAIN_SIZE), replace=False))], dtype=np.float32)
+        n_centroids = min(n_centroids, len(train))
+
+        centroids = np.empty((subspaces, n_centroids, sub_dim), dtype=np.float32)
+        for m in range(subspaces):
+            sub = train[:, m * sub_dim:(m + 1) * sub_dim]
+            centers = sub[rng.choice(len(sub), n_centroids, replace=False)].copy()
+            for _ in range(PQ_ITERATIONS):
+                assign = cls._nearest(sub, centers)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assign, sub)
+                counts = np.bincount(assign, minlength=n_centroids)[:, None]
+                # Centroid kosong dibiarkan di posisi lamanya
+                centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers)
+            centroids[m] = centers
+
+        quantizer = cls(centroids, np.empty((n, subspaces), dtype=np.uint8))
+        for i in _blocks(n):
+            quantizer.codes[i:i + BLOCK_SIZE] = quantizer.encode(np.asarray(vectors[i:i + BLOCK_SIZE], dtype=np.float32))
+        return quantizer
+
+    @staticmethod
+    def _nearest(points, centers):
+        d = (points ** 2).sum(axis=1, keepdims=True) - 2 * points @ centers.T + (centers ** 2).sum(axis=1)
+        return d.argmin(axis=1)
+
+    def encode(self, vectors):
+        subspaces, _, sub_dim = self.centroids.shape
+        return np.stack([
+            self._nearest(vectors[:, m * sub_dim:(m + 1) * sub_dim], self.centroids[m])
+            for m in range(subspaces)
+        ], axis=1).astype(np.uint8)
+
+    def distances(self, queries):
+        # Asymmetric distance: tabel jarak query ke setiap centroid, lalu dijumlahkan lewat kode
+        subspaces, _, sub_dim = self.centroids.shape
+        result = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        m_index = np.arange(subspaces)
+        for row, query in enumerate(queries):
+            sub = query.reshape(subspaces, 1, sub_dim)
+            table = ((self.centroids - sub) ** 2).sum(axis=2)  # (M, 256)
+            for i in _blocks(len(self.codes)):
+                codes = np.asarray(self.codes[i:i + BLOCK_SIZE])
+                result[row, i:i + BLOCK_SIZE] = table[m_index, codes].sum(axis=1)
+        return result
+
+    def save(self, index_dir):
+        _save_atomic(os.path.join(index_dir, 'pq_centroids.npy'), self.centroids)
+        _save_atomic(os.path.join(index_dir, 'pq_codes.npy'), self.codes)
+
+    @classmethod
+    def load(cls, index_dir):
+        return cls(
+            np.load(os.path.join(index_dir, 'pq_centroids.npy')),
+            np.load(os.path.join(index_dir, 'pq_codes.npy'), mmap_mode='r')
+        )
+
+    def nbytes(self):
+        return self.codes.nbytes + self.centroids.nbytes
+
+QUANTIZERS = {
+    'int8': (ScalarQuantizer, 'sq_codes.npy'),
+    'pq': (ProductQuantizer, 'pq_codes.npy'),
+}
+
+def quantizer_exists(index_dir, kind):
+    return os.path.exists(os.path.join(index_dir, QUANTIZERS[kind][1]))
+
+def load_quantizer(index_dir, kind):
+    return QUANTIZERS[kind][0].load(index_dir)
+
+def build_quantizers(vectors, index_dir, kinds=('int8', 'pq')):
+    for kind in kinds:
+        start = time.perf_counter()
+        quantizer = QUANTIZERS[kind][0].fit(vectors)
+        quantizer.save(index_dir)
+        print(f"✅ Kuantisasi {kind}: {quantizer.nbytes() / 1e6:.1f} MB ({time.perf_counter() - start:.1f} detik)")
+
+def top_k(distances, k):
+    k = min(k, distances.shape[1])
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def search(quantizer, vectors, queries, k, rerank_factor):
+    # Shortlist dari kode terkuantisasi, lalu jarak exact hanya untuk baris shortlist
+    shortlist = top_k(quantizer.distances(queries), k * rerank_factor if rerank_factor else k)
+    if not rerank_factor:
+        return shortlist
+    results = []
+    for query, candidates in zip(queries, shortlist):
+        exact = np.asarray(vectors[np.sort(candidates)], dtype=np.float32)
+        distances = ((exact - query) ** 2).sum(axis=1)
+        results.append(np.sort(candidates)[np.argsort(distances)[:k]])
+    return np.stack(results)
+
+def recall_at_k(truth, found):
+    return float(np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]))
+
+def benchmark(index_dir, num_queries=200, k=5, seed=0):
+    vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+    rng = np.random.default_rng(seed)
+    queries = np.asarray(vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)], dtype=np.float32)
+    queries += rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+
+    float_bytes = vectors.shape[0] * vectors.shape[1] * 4
+    truth = top_k(((queries ** 2).sum(axis=1, keepdims=True) + (np.asarray(vectors, dtype=np.float32) ** 2).sum(axis=1)
+                   - 2 * queries @ np.asarray(vectors, dtype=np.float32).T), k)
+
+    print(f"\n📊 {len(queries)} query, recall@{k} terhadap pencarian float32 exact ({float_bytes / 1e6:.1f} MB)\n")
+    print(f"{'metode':<16} {'memori MB':>10} {'hemat':>6} {'recall':>7} {'ms/query':>9}")
+    for kind in QUANTIZERS:
+        if not quantizer_exists(index_dir, kind):
+            continue
+        quantizer = load_quantizer(index_dir, kind)
+        for factor in (0, RERANK_FACTORS[kind], RERANK_FACTORS[kind] * 4):
+            t0 = time.perf_counter()
+            found = search(quantizer, vectors, queries, k, factor)
+            ms = (time.perf_counter() - t0) * 1000 / len(queries)
+            label = f"{kind}+rerank x{factor}" if factor else kind
+            print(f"{label:<16} {quantizer.nbytes() / 1e6:>10.1f} {float_bytes / quantizer.nbytes():>5.1f}x "
+                  f"{recall_at_k(truth, found):>7.3f} {ms:>9.2f}")
+
+if __name__ == "__main__":
+    from numpy_index import INDEX_DIR
+
+    build_quantizers(np.load(os.path.join(INDEX_DIR, 'vectors.npy'), mmap_mode='r'), INDEX_DIR)
+    benchmark(INDEX_DIR)
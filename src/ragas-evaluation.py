@@ -1,12 +1,20 @@
-import requests
 import json
 import csv
 import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_client import OllamaClient, LLMError
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "llama3.2:3b"
 INPUT_FILE = "Data/ragas-dataset.json"
 OUTPUT_FILE = "Data/ragas_results.csv"
+CACHE_FILE = "Data/ragas-judge-cache.jsonl"
+MAX_WORKERS = 4  # Sesuaikan dengan OLLAMA_NUM_PARALLEL di server
+TIMEOUT_SEC = 120
+METRICS = ["faithfulness", "answer_relevance", "context_precision", "context_recall"]
+
+llm = OllamaClient(read_timeout=TIMEOUT_SEC, pool_size=MAX_WORKERS)
+cache_lock = threading.Lock()
 
 def create_prompt(sample):
     prompt = f"""
@@ -57,22 +65,41 @@ Hanya jawab dengan format JSON berikut, tanpa penjelasan tambahan:
 """
     return prompt.strip()
 
-def evaluate_sample(sample):
-    prompt = create_prompt(sample)
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-    }
+def cache_key(prompt):
+    return hashlib.sha256(f"{llm.model}\0{prompt}".encode("utf-8")).hexdigest()
+
+def is_valid_result(result):
+    # Hanya objek dengan semua metrik bernilai angka yang boleh dipakai (dan masuk cache)
+    return isinstance(result, dict) and "error" not in result and all(
+        isinstance(result.get(k), (int, float)) and not isinstance(result.get(k), bool) for k in METRICS
+    )
+
+def load_cache(file_path=CACHE_FILE):
+    cache = {}
+    if os.path.exists(file_path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Entri dari versi lama bisa berupa list atau tanpa metrik lengkap: dinilai ulang
+                if isinstance(record, dict) and is_valid_result(record.get("result")):
+                    cache[record["key"]] = record["result"]
+    return cache
+
+def append_cache(key, result, file_path=CACHE_FILE):
+    with cache_lock, open(file_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": key, "result": result}, ensure_ascii=False) + "\n")
+
+def evaluate_sample(sample, prompt=None):
+    prompt = prompt or create_prompt(sample)
+    # Retry + backoff untuk 5xx/timeout ditangani OllamaClient
     try:
-        response = requests.post(OLLAMA_URL, json=payload)
-        response.raise_for_status()
-    except Exception as e:
+        raw_output = llm.generate(prompt)
+    except LLMError as e:
         return {"error": f"HTTP request error: {str(e)}"}
 
-    data = response.json()
-    raw_output = data.get("response", "")
-
     try:
         result = json.loads(raw_output)
     except json.JSONDecodeError:
@@ -86,6 +113,10 @@ def evaluate_sample(sample):
         else:
             result = {"error": "No JSON found in model output", "raw_output": raw_output}
 
+    if isinstance(result, dict) and "error" in result:
+        return result
+    if not is_valid_result(result):
+        return {"error": f"Model output missing numeric metrics {METRICS}", "raw_output": raw_output}
     return result
 
 def save_results_to_csv(results, mean_scores, filename=OUTPUT_FILE):
@@ -129,62 +160,74 @@ def load_samples_from_json(file_path):
         data = json.load(f)
     return data
 
+def judge_all(samples, cache):
+    # Hasilkan (indeks, hasil) segera setelah tersedia; sampel yang sudah pernah dinilai diambil dari cache
+    prompts = [create_prompt(sample) for sample in samples]
+    keys = [cache_key(prompt) for prompt in prompts]
+
+    for i, key in enumerate(keys):
+        if key in cache:
+            yield i, cache[key], True
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(evaluate_sample, samples[i], prompts[i]): i
+            for i, key in enumerate(keys) if key not in cache
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            result = future.result()
+            if is_valid_result(result):
+                append_cache(keys[i], result)
+            yield i, result, False
+
 def main():
     samples = load_samples_from_json(INPUT_FILE)
     if not samples:
         print("No data to evaluate.")
         return
 
-    results = []
-    sum_faithfulness = sum_answer_relevance = sum_context_precision = sum_context_recall = 0
+    cache = load_cache()
+    results = [None] * len(samples)
+    sums = {k: 0 for k in METRICS}
     count = 0
+    done = 0
 
-    for i, sample in enumerate(samples, 1):
-        print(f"Evaluating sample #{i}...")
-        result = evaluate_sample(sample)
+    for i, result, cached in judge_all(samples, cache):
+        sample = samples[i]
+        done += 1
 
         if "error" in result:
-            print(f"Error: {result['error']}")
-            faithfulness = answer_relevance = context_precision = context_recall = None
+            print(f"Error on sample #{i + 1}: {result['error']}")
+            scores = {k: None for k in METRICS}
         else:
-            faithfulness = result.get("faithfulness", None)
-            answer_relevance = result.get("answer_relevance", None)
-            context_precision = result.get("context_precision", None)
-            context_recall = result.get("context_recall", None)
-
-            if None not in (faithfulness, answer_relevance, context_precision, context_recall):
-                sum_faithfulness += faithfulness
-                sum_answer_relevance += answer_relevance
-                sum_context_precision += context_precision
-                sum_context_recall += context_recall
+            scores = {k: result.get(k, None) for k in METRICS}
+
+            if None not in scores.values():
+                for k in METRICS:
+                    sums[k] += scores[k]
                 count += 1
 
-        record = {
+        results[i] = {
             "question": sample["question"],
             "answer": sample["answer"],
             "contexts": json.dumps(sample["contexts"], ensure_ascii=False),
             "ground_truths": json.dumps(sample["ground_truths"], ensure_ascii=False),
-            "faithfulness": faithfulness,
-            "answer_relevance": answer_relevance,
-            "context_precision": context_precision,
-            "context_recall": context_recall,
+            **scores,
         }
-        results.append(record)
+
+        running = " | ".join(f"{k}={sums[k] / count:.3f}" for k in METRICS) if count else "-"
+        print(f"[{done}/{len(samples)}] sample #{i + 1}{' (cache)' if cached else ''} -> mean: {running}")
 
     if count > 0:
-        mean_scores = {
-            "faithfulness": sum_faithfulness / count,
-            "answer_relevance": sum_answer_relevance / count,
-            "context_precision": sum_context_precision / count,
-            "context_recall": sum_context_recall / count,
-        }
+        mean_scores = {k: sums[k] / count for k in METRICS}
 
         print("\n==== MEAN SCORES ====")
         for k, v in mean_scores.items():
             print(f"{k.capitalize().replace('_', ' ')}: {round(v, 4)}")
 
     else:
-        mean_scores = {k: 0.0 for k in ["faithfulness", "answer_relevance", "context_precision", "context_recall"]}
+        mean_scores = {k: 0.0 for k in METRICS}
         print("Tidak ada skor yang valid untuk dihitung rata-ratanya.")
 
     save_results_to_csv(results, mean_scores)
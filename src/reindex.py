@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import hashlib
+from embedding import (
+    CHUNKED_FILE, PERSIST_DIR, COLLECTION_NAME, EMBED_MODEL, BATCH_SIZE,
+    iter_chunks, iter_batches, ingest_chunks
+)
+from bm25_index import BM25Index, build_index
+from numpy_index import NumpyCollection, export_collection
+
+# Konfigurasi
+MANIFEST_FILE = os.path.join(PERSIST_DIR, 'manifest.json')
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(chunks, path=MANIFEST_FILE):
+    # Tulis ke file sementara lalu rename agar manifest tidak pernah setengah jadi
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"model": EMBED_MODEL, "chunks": chunks}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def manifest_from_collection(collection):
+    # Bangun manifest dari isi collection (misalnya setelah rebuild penuh lewat embedding.py)
+    chunks = {}
+    total = collection.count()
+    for offset in range(0, total, BATCH_SIZE):
+        batch = collection.get(limit=BATCH_SIZE, offset=offset, include=['documents'])
+        for chunk_id, doc in zip(batch['ids'], batch['documents']):
+            chunks[chunk_id] = content_hash(doc)
+    return chunks
+
+def fetch_embeddings(collection, ids):
+    embeddings = {}
+    for batch in iter_batches(ids, BATCH_SIZE):
+        result = collection.get(ids=batch, include=['embeddings'])
+        for chunk_id, embedding in zip(result['ids'], result['embeddings']):
+            embeddings[chunk_id] = [float(x) for x in embedding]
+    return embeddings
+
+def plan_reindex(desired, old_chunks):
+    # desired: {id: (hash, teks, metadata)}, old_chunks: {id: hash} dari manifest
+    old_by_hash = {}
+    for chunk_id, h in old_chunks.items():
+        if h is not None:
+            old_by_hash.setdefault(h, chunk_id)
+
+    unchanged, moved, new = [], {}, []
+    for chunk_id, (h, _, _) in desired.items():
+        if old_chunks.get(chunk_id) == h:
+            unchanged.append(chunk_id)
+        elif h in old_by_hash:
+            # Teks sama tapi pindah posisi: pakai ulang embedding lama
+            moved[chunk_id] = old_by_hash[h]
+        else:
+            new.append(chunk_id)
+
+    orphaned = [chunk_id for chunk_id in old_chunks if chunk_id not in desired]
+    return unchanged, moved, new, orphaned
+
+def reindex(chunked_file=CHUNKED_FILE):
+    # Import di sini agar modul lain (mis. semantic_cache) bisa memakai helper manifest tanpa memuat chromadb
+    from chromadb import PersistentClient
+
+    start = time.perf_counter()
+
+    with open(chunked_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    client = PersistentClient(path=PERSIST_DIR)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    manifest = load_manifest()
+    if manifest is None:
+        print("📝 Manifest belum ada, dibangun dari isi collection...")
+        old_chunks = manifest_from_collection(collection)
+    elif manifest.get("model") != EMBED_MODEL:
+        print(f"⚠️ Manifest dibuat dengan model {manifest.get('model')}, semua chunk akan di-embed ulang.")
+        old_chunks = {chunk_id: None for chunk_id in manifest["chunks"]}
+    else:
+        old_chunks = manifest["chunks"]
+
+    desired = {
+        chunk_id: (content_hash(text), text, meta)
+        for chunk_id, text, meta in iter_chunks(data)
+    }
+    unchanged, moved, new, orphaned = plan_reindex(desired, old_chunks)
+
+    print(f"\n🧮 Rencana reindex: {len(unchanged)} tetap, {len(moved)} pindah, "
+          f"{len(new)} baru/berubah, {len(orphaned)} dihapus\n")
+
+    # Ambil embedding lama sebelum ada penulisan yang bisa menimpanya
+    reused = fetch_embeddings(collection, sorted(set(moved.values())))
+
+    for batch in iter_batches(list(moved.items()), BATCH_SIZE):
+        batch = [(chunk_id, old_id) for chunk_id, old_id in batch if old_id in reused]
+        if not batch:
+            continue
+        collection.upsert(
+            ids=[chunk_id for chunk_id, _ in batch],
+            documents=[desired[chunk_id][1] for chunk_id, _ in batch],
+            embeddings=[reused[old_id] for _, old_id in batch],
+            metadatas=[desired[chunk_id][2] for chunk_id, _ in batch]
+        )
+
+    # Chunk pindah yang embedding lamanya ternyata hilang ikut di-encode ulang
+    to_encode = new + [chunk_id for chunk_id, old_id in moved.items() if old_id not in reused]
+    stats = {"chunks": 0, "chunks_per_sec": 0.0}
+    if to_encode:
+        stats = ingest_chunks(
+            collection,
+            ((chunk_id, desired[chunk_id][1], desired[chunk_id][2]) for chunk_id in to_encode),
+            total=len(to_encode),
+            method='upsert',
+            desc="🔄 Embedding chunk baru/berubah"
+        )
+
+    for batch in iter_batches(orphaned, BATCH_SIZE):
+        collection.delete(ids=batch)
+
+    save_manifest({chunk_id: h for chunk_id, (h, _, _) in desired.items()})
+
+    # Index BM25 dan ekspor numpy ikut diperbarui jika dipakai
+    if moved or to_encode or orphaned:
+        if BM25Index.exists():
+            build_index(collection)
+        if NumpyCollection.exists():
+            export_collection(collection)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Reindex selesai dalam {elapsed:.1f} detik: {stats['chunks']} chunk di-embed "
+          f"({stats['chunks_per_sec']:.1f} chunk/detik), {len(moved)} dipakai ulang, {len(orphaned)} dihapus")
+    print(f"🗂️ Manifest disimpan di: {MANIFEST_FILE}")
+
+if __name__ == "__main__":
+    reindex()
@@ -0,0 +1,50 @@
+import time
+
+# Konfigurasi
+RERANK_MODEL = 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1'  # Multibahasa, termasuk Indonesia
+BATCH_SIZE = 8
+BUDGET_MS = 300  # Total anggaran waktu retrieval + rerank per query
+
+class Reranker:
+    def __init__(self, model_name=RERANK_MODEL, device=None, budget_ms=BUDGET_MS):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, device=device, max_length=256)
+        self.budget_ms = budget_ms
+        self.last = None
+        self.calls = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+
+    def rerank(self, question, hits, top_n, spent_ms=0.0):
+        # hits: kandidat berurutan dengan field "text"; spent_ms: waktu yang sudah terpakai sebelum rerank
+        start = time.perf_counter()
+        self.calls += 1
+
+        if spent_ms >= self.budget_ms or len(hits) <= 1:
+            self.skipped += 1
+            self.last = {"candidates": len(hits), "scored": 0, "ms": 0.0, "skipped": True}
+            return hits[:top_n]
+
+        scored = []
+        for i in range(0, len(hits), BATCH_SIZE):
+            # Berhenti jika batch berikutnya akan melewati anggaran; sisa kandidat tetap di urutan awal
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if scored and spent_ms + elapsed_ms * (1 + BATCH_SIZE / len(scored)) > self.budget_ms:
+                break
+            batch = hits[i:i + BATCH_SIZE]
+            scores = self.model.predict([(question, hit["text"]) for hit in batch], batch_size=BATCH_SIZE)
+            scored.extend({**hit, "rerank_score": float(score)} for hit, score in zip(batch, scores))
+
+        ranked = sorted(scored, key=lambda hit: hit["rerank_score"], reverse=True) + hits[len(scored):]
+
+        ms = (time.perf_counter() - start) * 1000
+        self.total_ms += ms
+        self.last = {"candidates": len(hits), "scored": len(scored), "ms": ms, "skipped": False}
+        return ranked[:top_n]
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "avg_ms": self.total_ms / max(self.calls - self.skipped, 1)
+        }
@@ -0,0 +1,76 @@
+import os
+import time
+import threading
+from retrieval import open_collection
+from embedding_cache import EmbeddingCache
+
+# Konfigurasi
+EMBED_MODEL = 'all-MiniLM-L6-v2'
+EMBED_BACKEND = os.environ.get('EMBED_BACKEND', 'torch')  # 'torch', 'onnx' atau 'onnx-int8'
+ONNX_INT8_FILE = os.environ.get('EMBED_ONNX_FILE', 'onnx/model_quint8_avx2.onnx')  # Varian int8 yang ada di repo model
+
+class Lazy:
+    # Proxy untuk objek berat: dibuat saat atribut pertama kali diakses, atau lebih awal lewat warm_up.
+    # Kode pemakai tetap menulis embedder.encode(...) / collection.query(...) seperti biasa
+    def __init__(self, factory, name):
+        self._factory = factory
+        self._name = name
+        self._lock = threading.Lock()
+        self._value = None
+        self._load_sec = None
+
+    def load(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    start = time.perf_counter()
+                    value = self._factory()
+                    self._load_sec = time.perf_counter() - start
+                    self._value = value
+        return self._value
+
+    def is_loaded(self):
+        return self._value is not None
+
+    def load_seconds(self):
+        return self._load_sec
+
+    def __getattr__(self, attr):
+        # Hanya dipanggil untuk atribut yang tidak ada di Lazy sendiri
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+def warm_up(*resources):
+    # Muat di thread latar selagi pengguna mengetik pertanyaan pertama; query pertama menunggu lock yang sama
+    def run():
+        for resource in resources:
+            if resource is None:
+                continue
+            try:
+                resource.load()
+            except Exception as e:
+                # Error yang sama akan muncul lagi (dan ditangani) saat resource benar-benar dipakai
+                print(f"\n⚠️ Gagal memuat {resource._name} di latar belakang: {e}")
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def load_embed_model(model_name=EMBED_MODEL, backend=EMBED_BACKEND):
+    # Import sentence_transformers (dan torch) ditunda sampai model benar-benar dibutuhkan
+    from sentence_transformers import SentenceTransformer
+    if backend == 'torch':
+        return SentenceTransformer(model_name)
+    # ONNX Runtime di CPU: load dan inference lebih cepat, int8 juga lebih kecil
+    model_kwargs = {"file_name": ONNX_INT8_FILE} if backend == 'onnx-int8' else {}
+    return SentenceTransformer(model_name, backend='onnx', model_kwargs=model_kwargs)
+
+def embed_cache_name(model_name=EMBED_MODEL, backend=EMBED_BACKEND):
+    # Vektor int8 sedikit berbeda, jadi cache query dipisah per backend
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+def lazy_embedder(disk_dir=None):
+    return Lazy(lambda: EmbeddingCache(load_embed_model(), embed_cache_name(), disk_dir=disk_dir), "embedder")
+
+def lazy_collection(persist_dir, collection_name):
+    return Lazy(lambda: open_collection(persist_dir, collection_name), "collection")
@@ -0,0 +1,85 @@
+import os
+
+WINDOW = 2
+BACKEND = os.environ.get('RETRIEVAL_BACKEND', 'chroma')  # 'chroma' atau 'numpy'
+
+def open_collection(persist_dir, collection_name, backend=BACKEND):
+    # Backend numpy memakai hasil ekspor python src/numpy_index.py
+    if backend == 'numpy':
+        from numpy_index import NumpyCollection, INDEX_DIR
+        return NumpyCollection(INDEX_DIR)
+
+    from chromadb import PersistentClient
+    client = PersistentClient(path=persist_dir)
+    return client.get_or_create_collection(name=collection_name)
+
+def chunk_id(href, chunk_index):
+    # Sama dengan format id di embedding.py
+    return f"{href}_{chunk_index}"
+
+def neighbour_keys(metadatas, window=WINDOW):
+    # Kumpulkan (href, index) tetangga dalam urutan ranking, tanpa duplikat.
+    # rank = peringkat hit asal (mulai 1), distance = jarak chunk ke hit tersebut
+    keys = []
+    seen = set()
+    for rank, meta in enumerate(metadatas, 1):
+        idx = meta.get('chunk_index')
+        href = meta.get('href')
+        if idx is None or href is None:
+            continue
+
+        for offset in range(-window, window + 1):
+            j = idx + offset
+            if j < 0 or (href, j) in seen:
+                continue
+            seen.add((href, j))
+            keys.append((href, j, meta.get('name'), rank, abs(offset)))
+    return keys
+
+def expand_neighbours_batch(collection, metadatas_per_query, window=WINDOW):
+    # Satu collection.get berisi id tetangga dari semua query sekaligus
+    keys_per_query = [neighbour_keys(metas, window) for metas in metadatas_per_query]
+    ids = list(dict.fromkeys(chunk_id(href, j) for keys in keys_per_query for href, j, *_ in keys))
+    if not ids:
+        return [[] for _ in metadatas_per_query]
+
+    fetched = collection.get(ids=ids, include=['documents', 'metadatas'])
+    found = {
+        fetched_id: (doc, meta)
+        for fetched_id, doc, meta in zip(fetched['ids'], fetched['documents'], fetched['metadatas'])
+    }
+
+    results = []
+    for keys in keys_per_query:
+        chunks = []
+        for href, j, name, rank, distance in keys:
+            item = found.get(chunk_id(href, j))
+            if item is None:
+                # Di luar batas artikel atau chunk kosong yang tidak di-index
+                continue
+            doc, meta = item
+            chunks.append({
+                "id": chunk_id(href, j),
+                "name": name or meta.get('name'),
+                "href": href,
+                "chunk_index": j,
+                "text": doc.strip(),
+                "rank": rank,
+                "distance": distance
+            })
+        results.append(chunks)
+    return results
+
+def expand_neighbours(collection, metadatas, window=WINDOW):
+    return expand_neighbours_batch(collection, [metadatas], window)[0]
+
+def rrf_fuse(rankings, limit, k=60):
+    # Reciprocal-rank fusion: skor = jumlah 1 / (k + rank) dari setiap daftar hasil
+    scores = {}
+    metas = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, 1):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (k + rank)
+            metas.setdefault(hit["id"], hit)
+    best = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [{**metas[hit_id], "rrf_score": scores[hit_id]} for hit_id in best]
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from reindex import MANIFEST_FILE, load_manifest
+
+# Konfigurasi
+SIMILARITY_THRESHOLD = 0.92  # Cosine similarity minimal agar dianggap pertanyaan yang sama
+MAX_ENTRIES = 1000
+TTL_SEC = 24 * 60 * 60
+
+class SemanticCache:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl_sec=TTL_SEC, manifest_path=MANIFEST_FILE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.manifest_path = manifest_path
+        self.manifest_mtime = None
+        self.chunk_hashes = {}
+        self.entries = OrderedDict()  # Urutan = urutan LRU, paling lama dipakai di depan
+        self.lock = threading.Lock()
+        self.next_key = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_sec = 0.0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _refresh_manifest(self):
+        # Reindex menulis ulang manifest; entri yang chunk-nya berubah atau hilang dibuang
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return
+        if mtime == self.manifest_mtime:
+            return
+
+        manifest = load_manifest(self.manifest_path) or {}
+        self.chunk_hashes = manifest.get("chunks", {})
+        stale = [
+            key for key, entry in self.entries.items()
+            if any(self.chunk_hashes.get(chunk_id) != h for chunk_id, h in entry["chunks"].items())
+        ]
+        for key in stale:
+            del self.entries[key]
+        self.manifest_mtime = mtime
+
+    def _expire(self, now):
+        for key in [k for k, e in self.entries.items() if now - e["created"] > self.ttl_sec]:
+            del self.entries[key]
+
+    def lookup(self, embedding):
+        query = self._normalize(embedding)
+        now = time.time()
+
+        with self.lock:
+            self._refresh_manifest()
+            self._expire(now)
+
+            best_key, best_score = None, -1.0
+            if self.entries:
+                keys = list(self.entries)
+                matrix = np.stack([self.entries[key]["embedding"] for key in keys])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                best_key, best_score = keys[best], float(scores[best])
+
+            if best_key is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(best_key)
+            entry = self.entries[best_key]
+            self.hits += 1
+            self.saved_sec += entry["latency_sec"]
+            return {**entry, "similarity": best_score}
+
+    def store(self, embedding, context_docs, answer, latency_sec):
+        with self.lock:
+            self._refresh_manifest()
+            chunk_ids = [doc["id"] for doc in context_docs if doc.get("id")]
+            self.entries[self.next_key] = {
+                "embedding": self._normalize(embedding),
+                "chunks": {chunk_id: self.chunk_hashes.get(chunk_id) for chunk_id in chunk_ids},
+                "context": context_docs,
+                "answer": answer,
+                "latency_sec": latency_sec,
+                "created": time.time()
+            }
+            self.next_key += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_latency_sec": self.saved_sec
+        }
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from aiohttp import web
+
+# Embedder dan PersistentClient di-load sekali di sini dan dipakai bersama semua sesi
+from chatbot import (
+    TIMEOUT_SEC, MAX_HISTORY, TOP_K, WINDOW, SEMANTIC_CACHE,
+    answer_cache, reranker, packer_tokenizer, llm, embedder, collection, history_store,
+    embed_query, query_context_with_history, build_prompt, show_references
+)
+from llm_client import CONNECT_TIMEOUT_SEC, LLMError, LLMTimeoutError, LLMHTTPError
+from resources import warm_up
+from tracing import tracer, run_in_context
+
+# Konfigurasi
+HOST = os.environ.get('CHAT_HOST', '0.0.0.0')
+PORT = int(os.environ.get('CHAT_PORT', '8080'))
+RETRIEVAL_WORKERS = 4  # Thread untuk encode + query ChromaDB
+OLLAMA_POOL_SIZE = 16  # Maksimal koneksi keep-alive ke Ollama
+SESSION_IDLE_SEC = 30 * 60
+
+class Session:
+    def __init__(self, session_id):
+        self.id = session_id
+        # Sesi yang sudah dibersihkan (atau dari sebelum restart) dilanjutkan dari history_store,
+        # dibaca di executor pada giliran pertama (lihat ChatService.answer)
+        self.history = None
+        self.lock = asyncio.Lock()
+        self.last_seen = time.monotonic()
+
+class ChatService:
+    def __init__(self):
+        self.sessions = {}
+        self.executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS)
+        self.http = None
+        self.cleanup_task = None
+
+    async def start(self, app):
+        self.http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=OLLAMA_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT_SEC, sock_read=TIMEOUT_SEC)
+        )
+        self.cleanup_task = asyncio.create_task(self.cleanup_sessions())
+        # Port sudah bisa menerima koneksi selagi model dimuat; request pertama menunggu jika belum selesai
+        warm_up(embedder, collection, reranker, packer_tokenizer, history_store)
+
+    async def stop(self, app):
+        self.cleanup_task.cancel()
+        await self.http.close()
+        self.executor.shutdown(wait=False)
+
+    def get_session(self, session_id=None):
+        session_id = session_id or uuid.uuid4().hex
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id)
+        session.last_seen = time.monotonic()
+        return session
+
+    async def cleanup_sessions(self):
+        while True:
+            await asyncio.sleep(60)
+            now = time.monotonic()
+            for session_id, session in list(self.sessions.items()):
+                if now - session.last_seen > SESSION_IDLE_SEC and not session.lock.locked():
+                    del self.sessions[session_id]
+
+    async def run_blocking(self, func, *args):
+        # Konteks disalin agar span di thread executor masuk ke trace request ini
+        return await asyncio.get_running_loop().run_in_executor(self.executor, run_in_context(func, *args))
+
+    async def _stream_once(self, host, prompt):
+        start = time.perf_counter()
+        ttft = None
+        try:
+            async with self.http.post(f"{host}/api/generate", json={
+                "model": llm.model,
+                "prompt": prompt,
+                "stream": True
+            }) as response:
+                if response.status != 200:
+                    raise LLMHTTPError(response.status, (await response.text())[:500], host)
+
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError as e:
+                        raise LLMError(f"Baris stream dari {host} bukan JSON: {e}", host)
+                    if not isinstance(chunk, dict):
+                        raise LLMError(f"Baris stream dari {host} bukan objek JSON: {line[:200]!r}", host)
+                    if chunk.get("error"):
+                        raise LLMError(f"Error dari model: {chunk['error']}", host)
+                    if chunk.get("response"):
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        llm.record(host, "generate", start, ttft, chunk)
+                        return
+        except asyncio.TimeoutError as e:
+            raise LLMTimeoutError(f"Timeout ke {host}: {e}", host)
+        except aiohttp.ClientError as e:
+            raise LLMError(f"Gagal menghubungi {host}: {e}", host)
+        raise LLMError(f"Stream dari {host} berakhir tanpa 'done'", host)
+
+    async def ask_llama_stream(self, prompt):
+        # Host bergiliran lewat klien bersama (llm_client.py), sehingga load balancing dan metriknya sama
+        # dengan skrip lain. Retry hanya jika belum ada token yang terkirim ke pengguna
+        for attempt in range(llm.max_retries + 1):
+            sent = False
+            try:
+                async for token in self._stream_once(llm.next_endpoint(), prompt):
+                    sent = True
+                    yield token
+                return
+            except LLMError as e:
+                client_error = isinstance(e, LLMHTTPError) and e.status < 500
+                if sent or client_error or attempt == llm.max_retries:
+                    llm.count_error()
+                    raise
+            await asyncio.sleep(llm.backoff_sec * 2 ** attempt)
+
+    async def answer(self, session, question, on_token=None):
+        # Satu giliran per sesi pada satu waktu agar riwayat tetap berurutan
+        async with session.lock:
+            if session.history is None:
+                # Atribut dibaca di executor: history_store adalah Lazy, akses pertama membuka SQLite
+                session.history = await self.run_blocking(lambda: history_store.recent(session.id, MAX_HISTORY))
+            with tracer.trace("turn", session_id=session.id):
+                recent_history = session.history[-MAX_HISTORY:]
+                start = time.perf_counter()
+                embedding = await self.run_blocking(embed_query, question, recent_history)
+                with tracer.span("cache_lookup"):
+                    # lookup bisa membaca ulang manifest dan menumpuk ulang embedding cache: jalankan di executor
+                    cached = await self.run_blocking(answer_cache.lookup, embedding) if SEMANTIC_CACHE else None
+                if cached:
+                    context = cached['context']
+                else:
+                    context = await self.run_blocking(query_context_with_history, question, recent_history, TOP_K, WINDOW, embedding)
+                with tracer.span("prompt"):
+                    # pack_context menghitung token per kalimat (dan bisa memuat tokenizer), jangan di event loop
+                    prompt = await self.run_blocking(build_prompt, context, question, recent_history)
+
+                if cached:
+                    answer = cached['answer']
+                    if on_token:
+                        await on_token(answer)
+                elif prompt.startswith("Maaf, saya tidak memiliki informasi"):
+                    answer = prompt
+                    if on_token:
+                        await on_token(answer)
+                else:
+                    parts = []
+                    try:
+                        with tracer.span("generate"):
+                            async for token in self.ask_llama_stream(prompt):
+                                parts.append(token)
+                                if on_token:
+                                    await on_token(token)
+                    except LLMError as e:
+                        # Jawaban gagal tidak masuk riwayat maupun cache
+                        return {"session_id": session.id, "error": f"Gagal mendapat jawaban dari LLaMA: {e}"}
+                    answer = "".join(parts).strip()
+                    if SEMANTIC_CACHE and context and answer:
+                        await self.run_blocking(answer_cache.store, embedding, context, answer, time.perf_counter() - start)
+
+                session.history.append({"question": question, "answer": answer})
+                del session.history[:-MAX_HISTORY]
+                await self.run_blocking(lambda: history_store.append(session.id, question, answer))
+
+        return {
+            "session_id": session.id,
+            "answer": answer,
+            "references": show_references(context) if context else "Tidak ada referensi."
+        }
+
+service = ChatService()
+
+async def handle_chat(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        # JSONDecodeError dan UnicodeDecodeError (body bukan UTF-8) sama-sama turunan ValueError
+        return web.json_response({"error": "Body harus berupa JSON"}, status=400)
+    if not isinstance(body, dict):
+        return web.json_response({"error": "Body harus berupa objek JSON"}, status=400)
+
+    question = body.get("question", "")
+    if not isinstance(question, str):
+        return web.json_response({"error": "question harus berupa string"}, status=400)
+    question = question.strip()
+    if not question:
+        return web.json_response({"error": "Pertanyaan kosong"}, status=400)
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return web.json_response({"error": "session_id harus berupa string"}, status=400)
+
+    session = service.get_session(session_id)
+    result = await service.answer(session, question)
+    return web.json_response(result, status=502 if "error" in result else 200)
+
+async def handle_ws(request):
+    # Pesan masuk: {"question": ...}; keluar: {"type": "token"} lalu {"type": "done"}
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    session = service.get_session(request.query.get("session_id"))
+    await ws.send_json({"type": "session", "session_id": session.id})
+
+    async def send_token(token):
+        await ws.send_json({"type": "token", "text": token})
+
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            continue
+        try:
+            question = json.loads(msg.data).get("question", "")
+        except (json.JSONDecodeError, AttributeError):
+            question = ""
+        if not isinstance(question, str):
+            await ws.send_json({"type": "error", "error": "question harus berupa string"})
+            continue
+        question = question.strip()
+        if not question:
+            await ws.send_json({"type": "error", "error": "Pertanyaan kosong"})
+            continue
+
+        result = await service.answer(session, question, on_token=send_token)
+        await ws.send_json({"type": "error" if "error" in result else "done", **result})
+
+    return ws
+
+async def handle_metrics(request):
+    # Format teks Prometheus: latensi per tahap dan metrik Ollama (p50/p95/p99 dari jendela terakhir)
+    return web.Response(text=tracer.prometheus(), content_type='text/plain', charset='utf-8')
+
+async def handle_health(request):
+    return web.json_response({
+        "status": "ok",
+        "sessions": len(service.sessions),
+        "semantic_cache": answer_cache.stats(),
+        "reranker": reranker.stats() if reranker is not None and reranker.is_loaded() else None,
+        "llm": llm.stats(),
+        "stages": tracer.stats()
+    })
+
+def create_app():
+    app = web.Application()
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    app.router.add_post('/chat', handle_chat)
+    app.router.add_get('/ws', handle_ws)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    return app
+
+if __name__ == "__main__":
+    print(f"🩺 Server Chatbot Kesehatan Alodokter di http://{HOST}:{PORT}")
+    web.run_app(create_app(), host=HOST, port=PORT)
@@ -0,0 +1,11 @@
+import math
+
+def percentiles(values, points=(50, 95, 99)):
+    # Nearest-rank: p95 dari 20 nilai = nilai ke-19 setelah diurutkan
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{p}": ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+        for p in points
+    }
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from stats_util import percentiles
+
+# Konfigurasi
+TRACE_FILE = os.environ.get('TRACE_FILE', 'Data/traces.jsonl')  # Kosong = tanpa sink JSONL
+TRACE_MAX_BYTES = 5 * 1024 * 1024  # File di-rotate ke .1 jika melewati batas ini
+HISTOGRAM_WINDOW = 1000  # Jumlah observasi terakhir per metrik untuk p50/p95/p99
+PROMPT_LOG_FILE = 'log_prompt_debug.txt'
+PROMPT_SAMPLE_RATE = float(os.environ.get('PROMPT_SAMPLE_RATE', '0.05'))  # Porsi prompt yang ditulis ke log
+PROMPT_LOG_MAX_BYTES = 1024 * 1024
+METRIC_PREFIX = 'rag'
+
+# Trace aktif ikut tersalin ke task asyncio dan ke thread executor (lihat run_in_context)
+_current = contextvars.ContextVar('trace', default=None)
+
+def append_capped(path, text, max_bytes):
+    # Append biasa, tetapi file yang sudah melewati max_bytes dipindah ke path.1 (menimpa yang lama)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if os.path.exists(path) and os.path.getsize(path) + len(text) > max_bytes:
+        os.replace(path, path + '.1')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+class Histogram:
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        return {"count": self.count, "sum": self.total, **percentiles(list(self.values))}
+
+class Tracer:
+    # Satu trace = satu giliran chat; span = satu tahap di dalamnya (encode, query, rerank, llm, ...)
+    def __init__(self, trace_file=TRACE_FILE, max_bytes=TRACE_MAX_BYTES):
+        self.trace_file = trace_file
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.histograms = {}
+        # Sink JSONL ditulis thread terpisah: trace() dipanggil di event loop aiohttp, jangan blok di disk
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def observe(self, name, value):
+        # Masuk ke histogram bergulir dan ke trace aktif (jika ada)
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+        trace = _current.get()
+        if trace is not None:
+            trace["values"][name] = trace["values"].get(name, 0) + value
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_ms", (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        trace = {
+            "trace_id": uuid.uuid4().hex[:16],
+            "name": name,
+            "ts": datetime.now().isoformat(timespec='milliseconds'),
+            **attrs,
+            "values": {}
+        }
+        token = _current.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            self.observe(f"{name}_ms", (time.perf_counter() - start) * 1000)
+            _current.reset(token)
+            if self.trace_file:
+                self._start_writer()
+                self.queue.put(json.dumps(trace, ensure_ascii=False) + "\n")
+
+    def _start_writer(self):
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                self.writer.start()
+                atexit.register(self.close)
+
+    def _write_loop(self):
+        # Gabungkan baris yang sudah mengantre menjadi satu append; None = berhenti
+        while True:
+            lines = [self.queue.get()]
+            while not self.queue.empty():
+                lines.append(self.queue.get_nowait())
+            text = "".join(line for line in lines if line is not None)
+            if text:
+                try:
+                    append_capped(self.trace_file, text, self.max_bytes)
+                except OSError as e:
+                    print(f"⚠️ Gagal menulis trace ke {self.trace_file}: {e}")
+            for _ in lines:
+                self.queue.task_done()
+            if None in lines:
+                return
+
+    def flush(self):
+        # Tunggu semua trace yang mengantre selesai ditulis
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join(timeout=5)
+
+    def record_llm(self, metric):
+        # Metrik dari respons akhir Ollama (lihat OllamaClient.record)
+        self.observe("llm_latency_ms", metric["latency_sec"] * 1000)
+        if metric["ttft_sec"] is not None:
+            self.observe("llm_ttft_ms", metric["ttft_sec"] * 1000)
+        self.observe("ollama_prompt_eval_ms", metric["prompt_eval_ms"])
+        self.observe("ollama_eval_ms", metric["eval_ms"])
+        self.observe("ollama_prompt_eval_tokens", metric["prompt_eval_count"])
+        self.observe("ollama_eval_tokens", metric["eval_count"])
+
+    def stats(self):
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def prometheus(self):
+        # Format teks Prometheus: satu summary per metrik dengan kuantil dari jendela terakhir
+        lines = []
+        for name, summary in self.stats().items():
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for p in (50, 95, 99):
+                if f"p{p}" in summary:
+                    lines.append(f'{metric}{{quantile="{p / 100}"}} {summary[f"p{p}"]:.3f}')
+            lines.append(f"{metric}_sum {summary['sum']:.3f}")
+            lines.append(f"{metric}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+def current_trace():
+    return _current.get()
+
+def run_in_context(func, *args):
+    # Untuk run_in_executor: span di thread executor tercatat di trace milik request yang memanggil
+    context = contextvars.copy_context()
+    return lambda: context.run(func, *args)
+
+class PromptLogger:
+    # Pengganti append tanpa batas ke log_prompt_debug.txt: hanya sebagian prompt dicatat, ukuran file dibatasi
+    def __init__(self, path=PROMPT_LOG_FILE, sample_rate=PROMPT_SAMPLE_RATE, max_bytes=PROMPT_LOG_MAX_BYTES):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def log(self, question, prompt):
+        if random.random() >= self.sample_rate:
+            return False
+        trace = _current.get()
+        header = f"\n--- Prompt untuk Pertanyaan: {question} ---\n"
+        if trace is not None:
+            header = f"\n--- Prompt untuk Pertanyaan: {question} (trace {trace['trace_id']}) ---\n"
+        with self.lock:
+            append_capped(self.path, header + prompt + '\n', self.max_bytes)
+        return True
+
+# Inisialisasi
+tracer = Tracer()